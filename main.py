@@ -27,162 +27,781 @@ __author__ = 'Overdjoker048'
 __license__ = 'MIT'
 __copyright__ = 'Copyright (c) 2025 Overdjoker048'
 __version__ = '1.1.0'
-__all__ = ['TCP', 'UDP']
+__all__ = ['TCP', 'UDP', 'RateLimiter', 'ServerConfig', 'RequestHook', 'RequestSampler', 'RequestTrace',
+           'benchmark_startup']
 
-from threading import Thread
-from socket import socket, SOL_SOCKET, SO_REUSEADDR, AF_INET, SOCK_DGRAM, SOCK_STREAM
-from time import gmtime, strftime
+from threading import Thread, Lock, Event, Condition, current_thread
+from socket import (socket, socketpair, create_connection, SOL_SOCKET, SO_REUSEADDR, SO_KEEPALIVE, IPPROTO_TCP,
+                    TCP_KEEPIDLE, TCP_KEEPINTVL, TCP_KEEPCNT, AF_INET, SOCK_DGRAM, SOCK_STREAM, MSG_PEEK, SHUT_WR)
+from selectors import DefaultSelector, EVENT_READ
+from collections import OrderedDict, deque, namedtuple
+from types import MappingProxyType
+from signal import signal, SIGTERM
+try:
+    from signal import SIGHUP
+except ImportError:
+    SIGHUP = None
+from time import gmtime, strftime, monotonic, perf_counter
 from os import path
-from json import dumps
-from subprocess import run, TimeoutExpired
-
-__MIME_MAP = {
-    'html': 'text/html', 'htm': 'text/html', 'css': 'text/css', 'js': 'text/javascript',
-    'txt': 'text/plain', 'xml': 'text/xml', 'csv': 'text/csv', 'md': 'text/markdown',
-    'rtf': 'text/rtf', 'log': 'text/plain', 'conf': 'text/plain', 'ini': 'text/plain',
-    'jpg': 'image/jpeg', 'jpeg': 'image/jpeg', 'png': 'image/png', 'gif': 'image/gif',
-    'svg': 'image/svg+xml', 'webp': 'image/webp', 'bmp': 'image/bmp', 'ico': 'image/x-icon',
-    'tiff': 'image/tiff', 'tif': 'image/tiff', 'avif': 'image/avif', 'heic': 'image/heic',
-    'mp4': 'video/mp4', 'avi': 'video/x-msvideo', 'mov': 'video/quicktime',
-    'mkv': 'video/x-matroska', 'webm': 'video/webm', 'flv': 'video/x-flv',
-    'wmv': 'video/x-ms-wmv', '3gp': 'video/3gpp', 'm4v': 'video/x-m4v',
-    'mp3': 'audio/mpeg', 'wav': 'audio/wav', 'ogg': 'audio/ogg', 'aac': 'audio/aac',
-    'flac': 'audio/flac', 'm4a': 'audio/mp4', 'wma': 'audio/x-ms-wma',
-    'json': 'application/json', 'pdf': 'application/pdf', 'zip': 'application/zip',
-    'rar': 'application/vnd.rar', '7z': 'application/x-7z-compressed',
-    'tar': 'application/x-tar', 'gz': 'application/gzip', 'xz': 'application/x-xz',
-    'doc': 'application/msword', 'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-    'xls': 'application/vnd.ms-excel', 'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-    'ppt': 'application/vnd.ms-powerpoint', 'pptx': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
-    'woff': 'font/woff', 'woff2': 'font/woff2', 'ttf': 'font/ttf', 'otf': 'font/otf',
-    'eot': 'application/vnd.ms-fontobject', 'py': 'text/x-python', 'java': 'text/x-java-source',
-    'cpp': 'text/x-c++src', 'c': 'text/x-csrc', 'h': 'text/x-chdr', 'php': 'text/x-php',
-    'rb': 'text/x-ruby', 'go': 'text/x-go', 'rs': 'text/x-rust', 'sh': 'text/x-shellscript',
-    'sql': 'text/x-sql', 'yaml': 'text/yaml', 'yml': 'text/yaml', 'toml': 'text/plain',
-    'properties': 'text/plain', 'env': 'text/plain', 'lock': 'text/plain',
-    'exe': 'application/x-msdownload', 'msi': 'application/x-msi',
-    'deb': 'application/vnd.debian.binary-package', 'rpm': 'application/x-redhat-package-manager',
-    'dmg': 'application/x-apple-diskimage', 'pkg': 'application/octet-stream',
-    'bin': 'application/octet-stream', 'manifest': 'application/manifest+json',
-    'webmanifest': 'application/manifest+json', 'rss': 'application/rss+xml', 'atom': 'application/atom+xml'
-}
 
-__FORBIDDEN_EXTENSIONS = {
-    'py', 'pyc', 'pyo', 'pyd', 'pyw', 'pyz',
-    'java', 'class', 'jar',
-    'cpp', 'c', 'h', 'hpp', 'cc', 'cxx',
-    'php', 'php3', 'php4', 'php5', 'phtml',
-    'rb', 'rbw',
-    'go',
-    'rs',
-    'sh', 'bash', 'zsh', 'fish',
-    'bat', 'cmd', 'ps1',
-    'sql',
-    'pl', 'pm',
-    'lua',
-    'r',
-    'swift',
-    'kt', 'kts',
-    'scala',
-    'clj', 'cljs',
-    'hs',
-    'ml', 'mli',
-    'fs', 'fsi', 'fsx',
-    'vb', 'vbs',
-    'asp', 'aspx', 'ascx',
-    'jsp', 'jspx',
-    'env', 'environment',
-    'config', 'cfg', 'conf',
-    'ini',
-    'yaml', 'yml',
-    'toml',
-    'properties',
-    'plist',
-    'htaccess', 'htpasswd',
-    'gitignore', 'gitconfig',
-    'dockerignore', 'dockerfile',
-    'makefile', 'cmake',
-    'gradle',
-    'npmrc', 'yarnrc',
-    'log', 'logs',
-    'tmp', 'temp',
-    'bak', 'backup',
-    'old', 'orig',
-    'swp', 'swo',
-    'pid',
-    'sock',
-    'lock',
-    'exe', 'msi', 'app', 'deb', 'rpm', 'dmg', 'pkg',
-    'bin', 'run', 'out',
-    'so', 'dll', 'dylib',
-    'db', 'sqlite', 'sqlite3',
-    'mdb', 'accdb',
-    'dbf',
-    'rar', '7z', 'tar', 'gz', 'bz2', 'xz', 'lz',
-    'key', 'pem', 'crt', 'cer', 'p12', 'pfx', 'jks',
-    'pdb', 'map', 'debug',
-    'deps', 'packages',
-    'node_modules',
-    'vendor',
-}
+_ExtensionInfo = namedtuple('_ExtensionInfo', ['mime', 'cache', 'forbidden', 'interpreter'])
+_UNKNOWN_EXTENSION = _ExtensionInfo('application/octet-stream', 'default', False, None)
+_FORBIDDEN_EXTENSION = _ExtensionInfo('application/octet-stream', 'default', True, None)
 
-__BACKEND_EXTENSIONS = {
-    'py': 'python',
-    'php': 'php',
-    'rb': 'ruby',
-    'js': 'node',
-    'go': 'go run',
-    'java': 'java',
-    'pl': 'perl',
-    'lua': 'lua',
-    'r': 'Rscript',
+_EXTENSIONS = {
+    'html': _ExtensionInfo('text/html', 'default', False, None),
+    'htm': _ExtensionInfo('text/html', 'default', False, None),
+    'css': _ExtensionInfo('text/css', 'script', False, None),
+    'js': _ExtensionInfo('text/javascript', 'script', False, 'node'),
+    'txt': _ExtensionInfo('text/plain', 'default', False, None),
+    'xml': _ExtensionInfo('text/xml', 'default', False, None),
+    'csv': _ExtensionInfo('text/csv', 'default', False, None),
+    'md': _ExtensionInfo('text/markdown', 'default', False, None),
+    'rtf': _ExtensionInfo('text/rtf', 'default', False, None),
+    'log': _ExtensionInfo('text/plain', 'default', True, None),
+    'conf': _ExtensionInfo('text/plain', 'default', True, None),
+    'ini': _ExtensionInfo('text/plain', 'default', True, None),
+    'jpg': _ExtensionInfo('image/jpeg', 'image', False, None),
+    'jpeg': _ExtensionInfo('image/jpeg', 'image', False, None),
+    'png': _ExtensionInfo('image/png', 'image', False, None),
+    'gif': _ExtensionInfo('image/gif', 'image', False, None),
+    'svg': _ExtensionInfo('image/svg+xml', 'image', False, None),
+    'webp': _ExtensionInfo('image/webp', 'image', False, None),
+    'bmp': _ExtensionInfo('image/bmp', 'image', False, None),
+    'ico': _ExtensionInfo('image/x-icon', 'image', False, None),
+    'tiff': _ExtensionInfo('image/tiff', 'image', False, None),
+    'tif': _ExtensionInfo('image/tiff', 'image', False, None),
+    'avif': _ExtensionInfo('image/avif', 'image', False, None),
+    'heic': _ExtensionInfo('image/heic', 'image', False, None),
+    'mp4': _ExtensionInfo('video/mp4', 'default', False, None),
+    'avi': _ExtensionInfo('video/x-msvideo', 'default', False, None),
+    'mov': _ExtensionInfo('video/quicktime', 'default', False, None),
+    'mkv': _ExtensionInfo('video/x-matroska', 'default', False, None),
+    'webm': _ExtensionInfo('video/webm', 'default', False, None),
+    'flv': _ExtensionInfo('video/x-flv', 'default', False, None),
+    'wmv': _ExtensionInfo('video/x-ms-wmv', 'default', False, None),
+    '3gp': _ExtensionInfo('video/3gpp', 'default', False, None),
+    'm4v': _ExtensionInfo('video/x-m4v', 'default', False, None),
+    'mp3': _ExtensionInfo('audio/mpeg', 'default', False, None),
+    'wav': _ExtensionInfo('audio/wav', 'default', False, None),
+    'ogg': _ExtensionInfo('audio/ogg', 'default', False, None),
+    'aac': _ExtensionInfo('audio/aac', 'default', False, None),
+    'flac': _ExtensionInfo('audio/flac', 'default', False, None),
+    'm4a': _ExtensionInfo('audio/mp4', 'default', False, None),
+    'wma': _ExtensionInfo('audio/x-ms-wma', 'default', False, None),
+    'json': _ExtensionInfo('application/json', 'nocache', False, None),
+    'pdf': _ExtensionInfo('application/pdf', 'default', False, None),
+    'zip': _ExtensionInfo('application/zip', 'default', False, None),
+    'rar': _ExtensionInfo('application/vnd.rar', 'default', True, None),
+    '7z': _ExtensionInfo('application/x-7z-compressed', 'default', True, None),
+    'tar': _ExtensionInfo('application/x-tar', 'default', True, None),
+    'gz': _ExtensionInfo('application/gzip', 'default', True, None),
+    'xz': _ExtensionInfo('application/x-xz', 'default', True, None),
+    'doc': _ExtensionInfo('application/msword', 'default', False, None),
+    'docx': _ExtensionInfo('application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'default', False, None),
+    'xls': _ExtensionInfo('application/vnd.ms-excel', 'default', False, None),
+    'xlsx': _ExtensionInfo('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'default', False, None),
+    'ppt': _ExtensionInfo('application/vnd.ms-powerpoint', 'default', False, None),
+    'pptx': _ExtensionInfo('application/vnd.openxmlformats-officedocument.presentationml.presentation', 'default', False, None),
+    'woff': _ExtensionInfo('font/woff', 'default', False, None),
+    'woff2': _ExtensionInfo('font/woff2', 'default', False, None),
+    'ttf': _ExtensionInfo('font/ttf', 'default', False, None),
+    'otf': _ExtensionInfo('font/otf', 'default', False, None),
+    'eot': _ExtensionInfo('application/vnd.ms-fontobject', 'default', False, None),
+    'py': _ExtensionInfo('text/x-python', 'nocache', True, 'python'),
+    'java': _ExtensionInfo('text/x-java-source', 'nocache', True, 'java'),
+    'cpp': _ExtensionInfo('text/x-c++src', 'default', True, None),
+    'c': _ExtensionInfo('text/x-csrc', 'default', True, None),
+    'h': _ExtensionInfo('text/x-chdr', 'default', True, None),
+    'php': _ExtensionInfo('text/x-php', 'nocache', True, 'php'),
+    'rb': _ExtensionInfo('text/x-ruby', 'nocache', True, 'ruby'),
+    'go': _ExtensionInfo('text/x-go', 'nocache', True, 'go run'),
+    'rs': _ExtensionInfo('text/x-rust', 'default', True, None),
+    'sh': _ExtensionInfo('text/x-shellscript', 'default', True, None),
+    'sql': _ExtensionInfo('text/x-sql', 'default', True, None),
+    'yaml': _ExtensionInfo('text/yaml', 'default', True, None),
+    'yml': _ExtensionInfo('text/yaml', 'default', True, None),
+    'toml': _ExtensionInfo('text/plain', 'default', True, None),
+    'properties': _ExtensionInfo('text/plain', 'default', True, None),
+    'env': _ExtensionInfo('text/plain', 'default', True, None),
+    'lock': _ExtensionInfo('text/plain', 'default', True, None),
+    'exe': _ExtensionInfo('application/x-msdownload', 'default', True, None),
+    'msi': _ExtensionInfo('application/x-msi', 'default', True, None),
+    'deb': _ExtensionInfo('application/vnd.debian.binary-package', 'default', True, None),
+    'rpm': _ExtensionInfo('application/x-redhat-package-manager', 'default', True, None),
+    'dmg': _ExtensionInfo('application/x-apple-diskimage', 'default', True, None),
+    'manifest': _ExtensionInfo('application/manifest+json', 'default', False, None),
+    'webmanifest': _ExtensionInfo('application/manifest+json', 'default', False, None),
+    'rss': _ExtensionInfo('application/rss+xml', 'default', False, None),
+    'atom': _ExtensionInfo('application/atom+xml', 'default', False, None),
+    'pl': _ExtensionInfo('application/octet-stream', 'nocache', True, 'perl'),
+    'lua': _ExtensionInfo('application/octet-stream', 'nocache', True, 'lua'),
+    'r': _ExtensionInfo('application/octet-stream', 'nocache', True, 'Rscript'),
+    'pkg': _FORBIDDEN_EXTENSION, 'bin': _FORBIDDEN_EXTENSION, 'pyc': _FORBIDDEN_EXTENSION,
+    'pyo': _FORBIDDEN_EXTENSION, 'pyd': _FORBIDDEN_EXTENSION, 'pyw': _FORBIDDEN_EXTENSION,
+    'pyz': _FORBIDDEN_EXTENSION, 'class': _FORBIDDEN_EXTENSION, 'jar': _FORBIDDEN_EXTENSION,
+    'hpp': _FORBIDDEN_EXTENSION, 'cc': _FORBIDDEN_EXTENSION, 'cxx': _FORBIDDEN_EXTENSION,
+    'php3': _FORBIDDEN_EXTENSION, 'php4': _FORBIDDEN_EXTENSION, 'php5': _FORBIDDEN_EXTENSION,
+    'phtml': _FORBIDDEN_EXTENSION, 'rbw': _FORBIDDEN_EXTENSION, 'bash': _FORBIDDEN_EXTENSION,
+    'zsh': _FORBIDDEN_EXTENSION, 'fish': _FORBIDDEN_EXTENSION, 'bat': _FORBIDDEN_EXTENSION,
+    'cmd': _FORBIDDEN_EXTENSION, 'ps1': _FORBIDDEN_EXTENSION, 'pm': _FORBIDDEN_EXTENSION,
+    'swift': _FORBIDDEN_EXTENSION, 'kt': _FORBIDDEN_EXTENSION, 'kts': _FORBIDDEN_EXTENSION,
+    'scala': _FORBIDDEN_EXTENSION, 'clj': _FORBIDDEN_EXTENSION, 'cljs': _FORBIDDEN_EXTENSION,
+    'hs': _FORBIDDEN_EXTENSION, 'ml': _FORBIDDEN_EXTENSION, 'mli': _FORBIDDEN_EXTENSION,
+    'fs': _FORBIDDEN_EXTENSION, 'fsi': _FORBIDDEN_EXTENSION, 'fsx': _FORBIDDEN_EXTENSION,
+    'vb': _FORBIDDEN_EXTENSION, 'vbs': _FORBIDDEN_EXTENSION, 'asp': _FORBIDDEN_EXTENSION,
+    'aspx': _FORBIDDEN_EXTENSION, 'ascx': _FORBIDDEN_EXTENSION, 'jsp': _FORBIDDEN_EXTENSION,
+    'jspx': _FORBIDDEN_EXTENSION, 'environment': _FORBIDDEN_EXTENSION,
+    'config': _FORBIDDEN_EXTENSION, 'cfg': _FORBIDDEN_EXTENSION, 'plist': _FORBIDDEN_EXTENSION,
+    'htaccess': _FORBIDDEN_EXTENSION, 'htpasswd': _FORBIDDEN_EXTENSION,
+    'gitignore': _FORBIDDEN_EXTENSION, 'gitconfig': _FORBIDDEN_EXTENSION,
+    'dockerignore': _FORBIDDEN_EXTENSION, 'dockerfile': _FORBIDDEN_EXTENSION,
+    'makefile': _FORBIDDEN_EXTENSION, 'cmake': _FORBIDDEN_EXTENSION, 'gradle': _FORBIDDEN_EXTENSION,
+    'npmrc': _FORBIDDEN_EXTENSION, 'yarnrc': _FORBIDDEN_EXTENSION, 'logs': _FORBIDDEN_EXTENSION,
+    'tmp': _FORBIDDEN_EXTENSION, 'temp': _FORBIDDEN_EXTENSION, 'bak': _FORBIDDEN_EXTENSION,
+    'backup': _FORBIDDEN_EXTENSION, 'old': _FORBIDDEN_EXTENSION, 'orig': _FORBIDDEN_EXTENSION,
+    'swp': _FORBIDDEN_EXTENSION, 'swo': _FORBIDDEN_EXTENSION, 'pid': _FORBIDDEN_EXTENSION,
+    'sock': _FORBIDDEN_EXTENSION, 'app': _FORBIDDEN_EXTENSION, 'run': _FORBIDDEN_EXTENSION,
+    'out': _FORBIDDEN_EXTENSION, 'so': _FORBIDDEN_EXTENSION, 'dll': _FORBIDDEN_EXTENSION,
+    'dylib': _FORBIDDEN_EXTENSION, 'db': _FORBIDDEN_EXTENSION, 'sqlite': _FORBIDDEN_EXTENSION,
+    'sqlite3': _FORBIDDEN_EXTENSION, 'mdb': _FORBIDDEN_EXTENSION, 'accdb': _FORBIDDEN_EXTENSION,
+    'dbf': _FORBIDDEN_EXTENSION, 'bz2': _FORBIDDEN_EXTENSION, 'lz': _FORBIDDEN_EXTENSION,
+    'key': _FORBIDDEN_EXTENSION, 'pem': _FORBIDDEN_EXTENSION, 'crt': _FORBIDDEN_EXTENSION,
+    'cer': _FORBIDDEN_EXTENSION, 'p12': _FORBIDDEN_EXTENSION, 'pfx': _FORBIDDEN_EXTENSION,
+    'jks': _FORBIDDEN_EXTENSION, 'pdb': _FORBIDDEN_EXTENSION, 'map': _FORBIDDEN_EXTENSION,
+    'debug': _FORBIDDEN_EXTENSION, 'deps': _FORBIDDEN_EXTENSION, 'packages': _FORBIDDEN_EXTENSION,
+    'node_modules': _FORBIDDEN_EXTENSION, 'vendor': _FORBIDDEN_EXTENSION,
 }
 
+
+def _extension_info(file: str) -> _ExtensionInfo:
+    return _EXTENSIONS.get(path.splitext(file)[1][1:].lower(), _UNKNOWN_EXTENSION)
+
+
+def _dumps(obj, **kwargs) -> str:
+    from json import dumps
+    return dumps(obj, **kwargs)
+
+
+class ServerConfig(namedtuple('ServerConfig', ['directory', 'main_file', 'blacklist', 'backend_enabled',
+                                               'methodes', 'cache_enabled', 'cache_max_age'])):
+    """
+    Immutable snapshot of the serving configuration.
+
+    Servers read one snapshot per request and replace it as a whole on
+    reconfigure(), so a snapshot can be shared freely between threads.
+    Build a modified copy with `config._replace(...)`. Lists, sets and dicts
+    given to the constructor or to _replace() are copied into a frozenset and
+    read-only mappings, so later changes to them never reach the snapshot.
+
+    Attributes:
+        directory: Root directory of the served files
+        main_file: File served for "/"
+        blacklist: frozenset of paths that are never served
+        backend_enabled: Whether backend scripts are executed
+        methodes: Read-only mapping of HTTP method to enabled flag
+        cache_enabled: Whether static responses are cacheable
+        cache_max_age: Read-only mapping of "image", "script" and "default" to max-age seconds
+    """
+    __slots__ = ()
+
+    def __new__(cls, directory: str, main_file: str, blacklist, backend_enabled: bool, methodes,
+                cache_enabled: bool, cache_max_age) -> "ServerConfig":
+        return super().__new__(
+            cls,
+            directory,
+            main_file,
+            frozenset(blacklist),
+            bool(backend_enabled),
+            MappingProxyType({methode.upper(): bool(enabled) for methode, enabled in methodes.items()}),
+            bool(cache_enabled),
+            MappingProxyType({kind: int(max_age) for kind, max_age in cache_max_age.items()})
+        )
+
+    @classmethod
+    def _make(cls, iterable) -> "ServerConfig":
+        return cls(*iterable)
+
+    @classmethod
+    def default(cls, directory: str = "./", main_file: str = "index.html") -> "ServerConfig":
+        return cls(
+            directory=directory,
+            main_file=main_file,
+            blacklist=frozenset(),
+            backend_enabled=False,
+            methodes={
+                "GET": True,
+                "HEAD": True,
+                "POST": True,
+                "PUT": True,
+                "DELETE": True,
+                "CONNECT": True,
+                "OPTIONS": True,
+                "TRACE": True,
+                "PATCH": True
+            },
+            cache_enabled=True,
+            cache_max_age={"image": 31536000, "script": 86400, "default": 3600}
+        )
+
+
+def benchmark_startup(runs: int = 20) -> dict:
+    """
+    Measure the cold-start cost of this module in fresh interpreters.
+
+    Each run starts a new Python process that imports this file and resolves
+    one extension record. Returns the median, min and max of the import time
+    and of the whole process lifetime, in milliseconds.
+    """
+    from subprocess import run
+    from sys import executable
+    from time import perf_counter
+    from statistics import median
+
+    code = (
+        "from time import perf_counter\n"
+        "import importlib.util\n"
+        "start = perf_counter()\n"
+        f"spec = importlib.util.spec_from_file_location('http_sython_startup', {path.abspath(__file__)!r})\n"
+        "module = importlib.util.module_from_spec(spec)\n"
+        "spec.loader.exec_module(module)\n"
+        "module._extension_info('index.html')\n"
+        "print((perf_counter() - start) * 1000)\n"
+    )
+    imports, processes = [], []
+    for _ in range(runs):
+        start = perf_counter()
+        result = run([executable, "-c", code], capture_output=True, text=True, check=True)
+        processes.append((perf_counter() - start) * 1000)
+        imports.append(float(result.stdout))
+    return {
+        "import_ms": {"median": median(imports), "min": min(imports), "max": max(imports)},
+        "process_ms": {"median": median(processes), "min": min(processes), "max": max(processes)}
+    }
+
+
+class RateLimiter:
+    """
+    Per-client token bucket rate limiter.
+
+    Keeps one compact bucket per client IP holding the available request
+    tokens, the number of open connections and the number of running backend
+    scripts. Every `sweep_interval` seconds the table is swept of buckets that
+    are full and unused, `sweep_batch` buckets per call so no caller walks the
+    whole table under the lock. The table holds at most `max_clients` buckets:
+    once full, new clients are refused until an idle bucket can be evicted, so
+    a flood of spoofed source addresses cannot grow it without bound.
+
+    Args:
+        rate: Tokens refilled per second in each bucket (requests/sec).
+        burst: Maximum number of tokens a bucket can hold.
+        max_connections: Concurrent connections allowed per client (0 = unlimited).
+        max_backend: Concurrent backend executions allowed per client (0 = unlimited).
+        sweep_interval: Seconds between two sweeps of the bucket table.
+        max_clients: Maximum number of client buckets kept at once.
+
+    Example of use:
+        >>> server = TCP()
+        >>> server.enable_rate_limit(rate=20, burst=40, max_connections=8)
+        >>> server.start()
+    """
+    __slots__ = ['rate', 'burst', 'max_connections', 'max_backend', 'sweep_interval', 'max_clients',
+                 'sweep_batch', '__buckets', '__lock', '__next_sweep', '__unswept']
+
+    def __init__(self, rate: float = 50.0, burst: int = 100, max_connections: int = 32,
+                 max_backend: int = 4, sweep_interval: float = 60.0, max_clients: int = 65536) -> None:
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.max_connections = max_connections
+        self.max_backend = max_backend
+        self.sweep_interval = sweep_interval
+        self.max_clients = max_clients
+        self.sweep_batch = 64
+        # ip -> [tokens, last refill, open connections, running backend scripts]
+        self.__buckets = OrderedDict()
+        self.__lock = Lock()
+        self.__next_sweep = monotonic() + sweep_interval
+        self.__unswept = 0
+
+    def __len__(self) -> int:
+        return len(self.__buckets)
+
+    def __bucket(self, ip: str, now: float) -> list:
+        bucket = self.__buckets.get(ip)
+        if bucket is None:
+            if len(self.__buckets) >= self.max_clients:
+                self.__sweep(now, self.sweep_batch)
+                if len(self.__buckets) >= self.max_clients:
+                    return None
+            bucket = self.__buckets[ip] = [self.burst, now, 0, 0]
+        else:
+            tokens = bucket[0] + (now - bucket[1]) * self.rate
+            bucket[0] = tokens if tokens < self.burst else self.burst
+            bucket[1] = now
+        return bucket
+
+    def sweep(self) -> None:
+        now = monotonic()
+        with self.__lock:
+            self.__sweep(now, len(self.__buckets))
+            self.__unswept = 0
+            self.__next_sweep = now + self.sweep_interval
+
+    def __sweep(self, now: float, count: int) -> int:
+        # Buckets are visited oldest first; the ones still in use go back to the end.
+        buckets = self.__buckets
+        count = min(count, len(buckets))
+        for _ in range(count):
+            ip, bucket = buckets.popitem(last=False)
+            if bucket[2] or bucket[3] or bucket[0] + (now - bucket[1]) * self.rate < self.burst:
+                buckets[ip] = bucket
+        return count
+
+    def allow_request(self, ip: str) -> bool:
+        now = monotonic()
+        with self.__lock:
+            if now >= self.__next_sweep:
+                self.__unswept = len(self.__buckets)
+                self.__next_sweep = now + self.sweep_interval
+            if self.__unswept:
+                self.__unswept -= self.__sweep(now, min(self.__unswept, self.sweep_batch))
+            bucket = self.__bucket(ip, now)
+            if bucket is None or bucket[0] < 1.0:
+                return False
+            bucket[0] -= 1.0
+            return True
+
+    def acquire_connection(self, ip: str) -> bool:
+        with self.__lock:
+            bucket = self.__bucket(ip, monotonic())
+            if bucket is None or (self.max_connections and bucket[2] >= self.max_connections):
+                return False
+            bucket[2] += 1
+            return True
+
+    def release_connection(self, ip: str) -> None:
+        with self.__lock:
+            bucket = self.__buckets.get(ip)
+            if bucket is not None and bucket[2] > 0:
+                bucket[2] -= 1
+
+    def acquire_backend(self, ip: str) -> bool:
+        with self.__lock:
+            bucket = self.__bucket(ip, monotonic())
+            if bucket is None or (self.max_backend and bucket[3] >= self.max_backend):
+                return False
+            bucket[3] += 1
+            return True
+
+    def release_backend(self, ip: str) -> None:
+        with self.__lock:
+            bucket = self.__buckets.get(ip)
+            if bucket is not None and bucket[3] > 0:
+                bucket[3] -= 1
+
+
+class RequestTrace:
+    """
+    Timing record of one request, passed to every RequestHook callback.
+
+    Stages are measured back to back with perf_counter: "parse", "normalise",
+    "blacklist", the handler stage ("backend" for executed scripts, "handler"
+    otherwise), "send", and "hooks" for the time spent in the hooks themselves.
+    Proxied requests and CONNECT tunnels have a single "proxy" or "tunnel"
+    stage covering the whole exchange instead.
+
+    Attributes:
+        client_ip: Address of the client, "" if unknown
+        method: HTTP method, "" until the request line is parsed
+        path: Requested path, without the query string
+        status: Response status, e.g. "200 OK", "" until the response is built
+        stages: Dict of stage name to elapsed seconds
+        data: Free dict hooks can use to carry state between callbacks
+    """
+    __slots__ = ['client_ip', 'method', 'path', 'status', 'handler_stage', 'stages', 'data', 'start', '__last']
+
+    def __init__(self, client_ip: str = "") -> None:
+        self.client_ip = client_ip
+        self.method = self.path = self.status = ""
+        self.handler_stage = "handler"
+        self.stages = {}
+        self.data = {}
+        self.start = self.__last = perf_counter()
+
+    @property
+    def total(self) -> float:
+        return self.__last - self.start
+
+    def mark(self, stage: str) -> None:
+        now = perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + now - self.__last
+        self.__last = now
+
+
+class RequestHook:
+    """
+    Base class for request middleware hooks.
+
+    Override any of the callbacks; each receives the RequestTrace of the
+    request. on_request_start runs before parsing, on_route once the request
+    is routed to a file, on_handler_done when the response is built and
+    on_send_done once it has been sent. Early error responses skip on_route.
+    For proxied requests and tunnels, on_route runs once the upstream route
+    is known, and on_handler_done and on_send_done once the exchange is over.
+    Hooks run on the request thread; exceptions they raise are ignored.
+
+    Example of use:
+        >>> class Logger(RequestHook):
+        ...     def on_send_done(self, trace):
+        ...         print(trace.method, trace.path, trace.status, trace.total)
+        >>> server = TCP()
+        >>> server.add_hook(Logger())
+    """
+    def on_request_start(self, trace: RequestTrace) -> None:
+        pass
+
+    def on_route(self, trace: RequestTrace) -> None:
+        pass
+
+    def on_handler_done(self, trace: RequestTrace) -> None:
+        pass
+
+    def on_send_done(self, trace: RequestTrace) -> None:
+        pass
+
+
+class RequestSampler(RequestHook):
+    """
+    Built-in hook aggregating per-stage timings and keeping slow requests.
+
+    Every request adds to the per-stage count, total and maximum. Requests
+    slower than `slow_threshold` seconds are kept in a ring buffer of
+    `capacity` entries with their stage timings and, if `profile` is set, the
+    top `profile_lines` functions of a cProfile capture of the request.
+
+    Args:
+        slow_threshold: Seconds above which a request is recorded as slow
+        capacity: Maximum number of slow requests kept
+        profile: Profile every request with cProfile (expensive)
+        profile_lines: Number of functions kept from each profile
+
+    Example of use:
+        >>> server = TCP()
+        >>> sampler = server.enable_profiling(slow_threshold=0.2, profile=True)
+        >>> sampler.dump()["slow"]
+    """
+    def __init__(self, slow_threshold: float = 0.5, capacity: int = 256, profile: bool = False,
+                 profile_lines: int = 25) -> None:
+        self.slow_threshold = slow_threshold
+        self.profile = profile
+        self.profile_lines = profile_lines
+        self.__slow = deque(maxlen=capacity)
+        self.__stages = {}
+        self.__requests = 0
+        self.__lock = Lock()
+
+    def on_request_start(self, trace: RequestTrace) -> None:
+        if self.profile:
+            from cProfile import Profile
+            profiler = Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                return
+            trace.data["profiler"] = profiler
+
+    def on_send_done(self, trace: RequestTrace) -> None:
+        profiler = trace.data.pop("profiler", None)
+        if profiler is not None:
+            profiler.disable()
+        total = trace.total
+        with self.__lock:
+            self.__requests += 1
+            for stage, elapsed in trace.stages.items():
+                stats = self.__stages.get(stage)
+                if stats is None:
+                    stats = self.__stages[stage] = [0, 0.0, 0.0]
+                stats[0] += 1
+                stats[1] += elapsed
+                if elapsed > stats[2]:
+                    stats[2] = elapsed
+        if total < self.slow_threshold:
+            return
+
+        entry = {
+            "method": trace.method,
+            "path": trace.path,
+            "status": trace.status,
+            "client": trace.client_ip,
+            "timestamp": strftime('%a, %d %b %Y %H:%M:%S GMT', gmtime()),
+            "total_ms": round(total * 1000, 3),
+            "stages_ms": {stage: round(elapsed * 1000, 3) for stage, elapsed in trace.stages.items()}
+        }
+        if profiler is not None:
+            from io import StringIO
+            from pstats import Stats
+            output = StringIO()
+            Stats(profiler, stream=output).sort_stats("cumulative").print_stats(self.profile_lines)
+            entry["profile"] = output.getvalue()
+        with self.__lock:
+            self.__slow.append(entry)
+
+    def dump(self) -> dict:
+        with self.__lock:
+            return {
+                "requests": self.__requests,
+                "stages": {stage: {"count": count, "total_ms": round(total * 1000, 3),
+                                   "avg_ms": round(total * 1000 / count, 3), "max_ms": round(peak * 1000, 3)}
+                           for stage, (count, total, peak) in self.__stages.items()},
+                "slow": list(self.__slow)
+            }
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__slow.clear()
+            self.__stages.clear()
+            self.__requests = 0
+
+
+def _run_hooks(hooks: tuple, callback: str, trace: RequestTrace) -> None:
+    for hook in hooks:
+        try:
+            getattr(hook, callback)(trace)
+        except Exception:
+            pass
+    trace.mark("hooks")
+
+
+def _traced(send_response: callable, trace: RequestTrace, hooks: tuple) -> callable:
+    started = []
+    def send(response: bytes) -> None:
+        if started:
+            send_response(response)
+            return
+        started.append(True)
+        trace.mark(trace.handler_stage)
+        trace.status = response[:response.find(b"\r\n")].decode('latin-1').partition(' ')[2]
+        _run_hooks(hooks, "on_handler_done", trace)
+        send_response(response)
+        trace.mark("send")
+        _run_hooks(hooks, "on_send_done", trace)
+    return send
+
+
 class __HTTP(Thread):
-    __slot__ = ['__socket', '__methodes', 'dir', 'main_file', 'blacklist']
-    def __init__(self, socket: socket, directory: str = "./", main_file: str = "index.html") -> None:
+    __slot__ = ['_socket', '__config', '__config_lock', 'rate_limiter', '_draining', '_drain_deadline',
+                '_in_flight', '_drained', '_hooks', '_admin']
+    def __init__(self, socket: socket, directory: str = "./", main_file: str = "index.html", port: int = 80) -> None:
         Thread.__init__(self)
-        self.__socket = socket
-        self.__socket.setsockopt(SOL_SOCKET, SO_REUSEADDR, 1)
-        self.__socket.bind(("", 80))
-        self.__methodes = {
-            "GET": True,
-            "HEAD": True,
-            "POST": True,
-            "PUT": True,
-            "DELETE": True,
-            "CONNECT": True,
-            "OPTIONS": True,
-            "TRACE": True,
-            "PATCH": True
-        }
-        self.dir = directory
-        self.main_file = main_file
-        self.blacklist = []
+        self._socket = socket
+        self._socket.setsockopt(SOL_SOCKET, SO_REUSEADDR, 1)
+        self._socket.bind(("", port))
+        self.__config_lock = Lock()
+        self.__config = ServerConfig.default(directory, main_file)
+        self.rate_limiter = None
+        self._draining = Event()
+        self._drain_deadline = 0.0
+        self._in_flight = 0
+        self._drained = Condition()
+        self._hooks = ()
+        self._admin = None
+
+    @property
+    def config(self) -> ServerConfig:
+        return self.__config
+
+    @config.setter
+    def config(self, config: ServerConfig) -> None:
+        if not isinstance(config, ServerConfig):
+            raise TypeError(f"Expected ServerConfig, got {type(config).__name__}")
+        with self.__config_lock:
+            self.__config = config
+
+    @property
+    def dir(self) -> str:
+        return self.__config.directory
+
+    @dir.setter
+    def dir(self, directory: str) -> None:
+        self.reconfigure(directory=directory)
+
+    @property
+    def main_file(self) -> str:
+        return self.__config.main_file
+
+    @main_file.setter
+    def main_file(self, main_file: str) -> None:
+        self.reconfigure(main_file=main_file)
+
+    @property
+    def blacklist(self) -> frozenset:
+        return self.__config.blacklist
+
+    @blacklist.setter
+    def blacklist(self, blacklist: list) -> None:
+        self.reconfigure(blacklist=blacklist)
+
+    @property
+    def backend_enabled(self) -> bool:
+        return self.__config.backend_enabled
+
+    def reconfigure(self, directory: str = None, main_file: str = None, blacklist: list = None,
+                    backend_enabled: bool = None, methodes: dict = None, cache_enabled: bool = None,
+                    cache_max_age: dict = None) -> None:
+        """
+        Atomically replace part of the server configuration.
+
+        A new immutable snapshot is built from the current one and swapped in a
+        single assignment, so in-flight requests finish with the configuration
+        they started with and listeners keep running. Arguments left to None
+        are unchanged.
+        """
+        changes = {}
+        if directory is not None:
+            changes["directory"] = directory
+        if main_file is not None:
+            changes["main_file"] = main_file
+        if blacklist is not None:
+            changes["blacklist"] = blacklist
+        if backend_enabled is not None:
+            changes["backend_enabled"] = backend_enabled
+        if cache_enabled is not None:
+            changes["cache_enabled"] = cache_enabled
+        with self.__config_lock:
+            config = self.__config
+            if methodes is not None:
+                changes["methodes"] = {**config.methodes, **{k.upper(): v for k, v in methodes.items()}}
+            if cache_max_age is not None:
+                changes["cache_max_age"] = {**config.cache_max_age, **cache_max_age}
+            self.__config = config._replace(**changes)
 
     def allow_methode(self, methode: str) -> None:
-        self.methodes[methode.upper()] = True
+        self.reconfigure(methodes={methode: True})
     
     def disable_methode(self, methode: str) -> None:
-        self.methodes[methode.upper()] = False
+        self.reconfigure(methodes={methode: False})
     
     def enable_backend(self, enabled: bool = True) -> None:
-        self.backend_enabled = enabled
+        self.reconfigure(backend_enabled=enabled)
+
+    def add_hook(self, hook: RequestHook) -> None:
+        self._hooks = self._hooks + (hook,)
+
+    def remove_hook(self, hook: RequestHook) -> None:
+        self._hooks = tuple(h for h in self._hooks if h is not hook)
+
+    def enable_profiling(self, slow_threshold: float = 0.5, capacity: int = 256, profile: bool = False,
+                         admin_path: str = "/__sython/profile") -> RequestSampler:
+        """
+        Install a RequestSampler and serve its dump as JSON on `admin_path`.
+
+        The admin endpoint only answers GET requests from loopback clients.
+        Pass admin_path=None to keep the sampler without an endpoint.
+        """
+        self.disable_profiling()
+        sampler = RequestSampler(slow_threshold, capacity, profile)
+        self.add_hook(sampler)
+        self._admin = (admin_path, sampler) if admin_path else (None, sampler)
+        return sampler
+
+    def disable_profiling(self) -> None:
+        if self._admin is not None:
+            self.remove_hook(self._admin[1])
+            self._admin = None
+
+    def __admin_response(self, sampler: RequestSampler, version: str) -> bytes:
+        data = _dumps(sampler.dump(), indent=2).encode('utf-8')
+        return (
+            f"{version} 200 OK\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Date: {strftime('%a, %d %b %Y %H:%M:%S GMT', gmtime())}\r\n"
+            "Server: HTTP Sython 1.2 Secure\r\n"
+            "Cache-Control: no-cache, no-store, must-revalidate\r\n"
+            "X-Content-Type-Options: nosniff\r\n\r\n"
+        ).encode('utf-8') + data
+
+    def _begin_request(self) -> None:
+        with self._drained:
+            self._in_flight += 1
+
+    def _end_request(self) -> None:
+        with self._drained:
+            self._in_flight -= 1
+            if not self._in_flight:
+                self._drained.notify_all()
+
+    def _wait_drained(self, timeout: float) -> bool:
+        with self._drained:
+            return self._drained.wait_for(lambda: not self._in_flight, max(timeout, 0))
+
+    def _wakeup(self) -> None:
+        pass
+
+    def stop(self, drain_timeout: float = 10.0) -> None:
+        """
+        Stop accepting new requests and let in-flight ones finish.
+
+        Returns once the server loop has exited, or after `drain_timeout`
+        seconds at most. Requests still running past the deadline are
+        abandoned. A stopped server cannot be restarted.
+        """
+        if not self._draining.is_set():
+            self._drain_deadline = monotonic() + drain_timeout
+            self._draining.set()
+        self._wakeup()
+        if self.is_alive() and current_thread() is not self:
+            self.join(max(self._drain_deadline - monotonic(), 0) + 1.0)
+
+    def install_signal_handlers(self, drain_timeout: float = 10.0, reload: callable = None) -> None:
+        """
+        Drain and stop on SIGTERM, and reconfigure on SIGHUP.
+
+        `reload` is called on SIGHUP and must return a dict of reconfigure()
+        arguments. If it raises or returns invalid arguments, the current
+        configuration is kept and the error is written to stderr. Must be
+        called from the main thread.
+        """
+        signal(SIGTERM, lambda signum, frame: self.stop(drain_timeout))
+        if reload is not None and SIGHUP is not None:
+            signal(SIGHUP, lambda signum, frame: self.__reload(reload))
+
+    def __reload(self, reload: callable) -> None:
+        try:
+            self.reconfigure(**reload())
+        except Exception as e:
+            from sys import stderr
+            stderr.write(f"HTTP Sython: reload failed, keeping the current configuration: {e!r}\n")
+
+    def enable_rate_limit(self, rate: float = 50.0, burst: int = 100, max_connections: int = 32,
+                          max_backend: int = 4, max_clients: int = 65536) -> None:
+        self.rate_limiter = RateLimiter(rate, burst, max_connections, max_backend, max_clients=max_clients)
+
+    def disable_rate_limit(self) -> None:
+        self.rate_limiter = None
+
+    def limit_exceeded(self, status: str = "429 Too Many Requests", version: str = "HTTP/1.1") -> bytes:
+        return (f"{version} {status}\r\n"
+                "Content-Length: 0\r\n"
+                "Retry-After: 1\r\n"
+                f"Date: {strftime('%a, %d %b %Y %H:%M:%S GMT', gmtime())}\r\n"
+                "Server: HTTP Sython 1.2 Secure\r\n"
+                "Connection: close\r\n\r\n").encode('utf-8')
 
     def is_forbidden_file(self, file: str) -> bool:
-        ext = path.splitext(file)[1][1:].lower()
-        return ext in __FORBIDDEN_EXTENSIONS
+        return _extension_info(file).forbidden
 
-    def execute_backend_script(self, file: str, query_params: str = "") -> tuple:
-        if not self.backend_enabled:
+    def execute_backend_script(self, file: str, query_params: str = "", config: ServerConfig = None,
+                               info: _ExtensionInfo = None) -> tuple:
+        if not (config or self.__config).backend_enabled:
             return False, "Backend execution is disabled"
             
-        ext = path.splitext(file)[1][1:].lower()
-        if ext not in __BACKEND_EXTENSIONS:
-            return False, f"Unsupported backend language: {ext}"
-            
+        interpreter = (info or _extension_info(file)).interpreter
+        if interpreter is None:
+            return False, f"Unsupported backend language: {path.splitext(file)[1][1:].lower()}"
+
+        from subprocess import run, TimeoutExpired
         try:
-            interpreter = __BACKEND_EXTENSIONS[ext]
             cmd = interpreter.split() + [file]
             
             env = {
@@ -193,7 +812,7 @@ class __HTTP(Thread):
                 'PATH': path.dirname(file)
             }
 
-            if ext == 'py':
+            if interpreter == 'python':
                 env['PYTHONPATH'] = path.dirname(file)
 
             result = run(
@@ -212,7 +831,7 @@ class __HTTP(Thread):
         except TimeoutExpired:
             return False, "Script execution timeout"
         except FileNotFoundError:
-            return False, f"Interpreter not found for {ext} files"
+            return False, f"Interpreter not found: {interpreter}"
         except Exception as e:
             return False, f"Execution error: {str(e)}"
 
@@ -226,8 +845,11 @@ class __HTTP(Thread):
                 f"Date: {strftime('%a, %d %b %Y %H:%M:%S GMT', gmtime())}\r\n"
                 f"Server: HTTP Sython 1.1\r\n\r\n".encode("utf-8"))
 
-    def get(self, file: str, full: bool = True, version: str = "HTTP/1.1", query_params: str = "") -> bytes:
-        if self.is_forbidden_file(file):
+    def get(self, file: str, full: bool = True, version: str = "HTTP/1.1", query_params: str = "",
+            client_ip: str = "", config: ServerConfig = None, info: _ExtensionInfo = None) -> bytes:
+        config = config or self.__config
+        info = info or _extension_info(file)
+        if info.forbidden:
             data = b"<html><body><h1>403 Forbidden</h1><p>Access to this file type is not allowed for security reasons.</p></body></html>"
             status = f"{version} 403 Forbidden"
             content_type = "text/html; charset=utf-8"
@@ -246,12 +868,18 @@ class __HTTP(Thread):
                 return headers.encode('utf-8')
             return headers.encode('utf-8') + data
 
-        ext = path.splitext(file)[1][1:].lower()
-        content_type = __MIME_MAP.get(ext, 'application/octet-stream')
+        content_type = info.mime
 
         try:
-            if ext in __BACKEND_EXTENSIONS and path.exists(file):
-                success, output = self.execute_backend_script(file, query_params)
+            if config.backend_enabled and info.interpreter is not None and path.exists(file):
+                limiter = self.rate_limiter
+                if limiter is not None and not limiter.acquire_backend(client_ip):
+                    return self.limit_exceeded("503 Service Unavailable", version)
+                try:
+                    success, output = self.execute_backend_script(file, query_params, config, info)
+                finally:
+                    if limiter is not None:
+                        limiter.release_backend(client_ip)
                 if success:
                     data = output.encode('utf-8')
                     content_type = "text/html; charset=utf-8"
@@ -282,22 +910,19 @@ class __HTTP(Thread):
             "Server: HTTP Sython 1.2 Secure"
         ]
 
-        if content_type.startswith('image/'):
-            cache_header = "Cache-Control: public, max-age=31536000"
-        elif 'javascript' in content_type or content_type.startswith('text/css'):
-            cache_header = "Cache-Control: public, max-age=86400"
-        elif content_type == 'application/json':
-            cache_header = "Cache-Control: no-cache, no-store, must-revalidate"
-        elif ext in __BACKEND_EXTENSIONS:
+        if content_type == info.mime:
+            cache = info.cache
+        else:
+            cache = 'nocache' if info.interpreter is not None else 'default'
+        if not config.cache_enabled or cache == 'nocache':
             cache_header = "Cache-Control: no-cache, no-store, must-revalidate"
         else:
-            cache_header = "Cache-Control: public, max-age=3600"
+            cache_header = f"Cache-Control: public, max-age={config.cache_max_age[cache]}"
             
         headers_list.append(cache_header)
         headers_list.append("X-Content-Type-Options: nosniff")
         headers_list.append("X-Frame-Options: DENY")
         headers_list.append("X-XSS-Protection: 1; mode=block")
-        headers_list.append("Connection: close")
         
         headers = "\r\n".join(headers_list) + "\r\n\r\n"
         
@@ -307,7 +932,7 @@ class __HTTP(Thread):
 
     def post(self, file: str, body: bytes = b"", version: str = "HTTP/1.1") -> bytes:
         if self.is_forbidden_file(file):
-            data = dumps({
+            data = _dumps({
                 "status": "error",
                 "message": "Access to this file type is not allowed for security reasons"
             }).encode('utf-8')
@@ -358,11 +983,11 @@ class __HTTP(Thread):
                 }
                 status = f"{version} 200 OK"
             
-            data = dumps(response_data, indent=2).encode('utf-8')
+            data = _dumps(response_data, indent=2).encode('utf-8')
             content_type = "application/json; charset=utf-8"
             
         except Exception as e:
-            data = dumps({
+            data = _dumps({
                 "status": "error",
                 "message": f"Failed to process POST request: {str(e)}"
             }).encode('utf-8')
@@ -381,7 +1006,7 @@ class __HTTP(Thread):
 
     def put(self, file: str, body: bytes = b"", version: str = "HTTP/1.1") -> bytes:
         if self.is_forbidden_file(file):
-            data = dumps({
+            data = _dumps({
                 "status": "error",
                 "message": "Access to this file type is not allowed for security reasons"
             }).encode('utf-8')
@@ -409,10 +1034,10 @@ class __HTTP(Thread):
                     "timestamp": strftime('%a, %d %b %Y %H:%M:%S GMT', gmtime())
                 }
                 
-                data = dumps(response_data, indent=2).encode('utf-8')
+                data = _dumps(response_data, indent=2).encode('utf-8')
                 
             except Exception as e:
-                data = dumps({
+                data = _dumps({
                     "status": "error",
                     "message": f"Failed to process PUT request: {str(e)}"
                 }).encode('utf-8')
@@ -428,8 +1053,8 @@ class __HTTP(Thread):
             "Connection: close\r\n\r\n"
         ).encode('utf-8') + data
 
-    def delete(self, file: str, version: str = "HTTP/1.1") -> bytes:
-        if self.is_forbidden_file(file) or file in [self.main_file, ".", ".."]:
+    def delete(self, file: str, version: str = "HTTP/1.1", config: ServerConfig = None) -> bytes:
+        if self.is_forbidden_file(file) or file in [(config or self.__config).main_file, ".", ".."]:
             status = f"{version} 403 Forbidden"
             response_data = {
                 "status": "error",
@@ -472,7 +1097,7 @@ class __HTTP(Thread):
                     "message": f"Failed to delete resource: {str(e)}"
                 }
         
-        data = dumps(response_data, indent=2).encode('utf-8')
+        data = _dumps(response_data, indent=2).encode('utf-8')
         
         return (
             f"{status}\r\n"
@@ -484,33 +1109,9 @@ class __HTTP(Thread):
             "Connection: close\r\n\r\n"
         ).encode('utf-8') + data
 
-    def connect(self, target: str, version: str = "HTTP/1.1") -> bytes:
-        try:
-            if ':' in target:
-                _, port = target.split(':', 1)
-                port = int(port)
-                if port in [80, 443]:
-                    status = f"{version} 200 Connection established"
-                else:
-                    status = f"{version} 403 Forbidden"
-            else:
-                status = f"{version} 400 Bad Request"
-            
-        except ValueError:
-            status = f"{version} 400 Bad Request"
-        except Exception:
-            status = f"{version} 500 Internal Server Error"
-
-        return (
-            f"{status}\r\n"
-            f"Date: {strftime('%a, %d %b %Y %H:%M:%S GMT', gmtime())}\r\n"
-            "Server: HTTP Sython 1.2 Secure\r\n"
-            "Connection: close\r\n\r\n"
-        ).encode('utf-8')
-
     def patch(self, file: str, body: bytes = b"", version: str = "HTTP/1.1") -> bytes:
         if self.is_forbidden_file(file):
-            data = dumps({
+            data = _dumps({
                 "status": "error",
                 "message": "Access to this file type is not allowed for security reasons"
             }).encode('utf-8')
@@ -543,11 +1144,11 @@ class __HTTP(Thread):
                         "timestamp": strftime('%a, %d %b %Y %H:%M:%S GMT', gmtime())
                     }
                 
-                data = dumps(response_data, indent=2).encode('utf-8')
+                data = _dumps(response_data, indent=2).encode('utf-8')
                 
             except Exception as e:
                 status = f"{version} 500 Internal Server Error"
-                data = dumps({
+                data = _dumps({
                     "status": "error",
                     "message": f"Failed to apply patch: {str(e)}"
                 }).encode('utf-8')
@@ -575,7 +1176,13 @@ class __HTTP(Thread):
             f"{requests}"
         ).encode('utf-8')
     
-    def handle_requests(self, request_data: bytes, send_response: callable) -> None:
+    def handle_requests(self, request_data: bytes, send_response: callable, client_ip: str = "") -> None:
+        hooks = self._hooks
+        trace = None
+        if hooks:
+            trace = RequestTrace(client_ip)
+            _run_hooks(hooks, "on_request_start", trace)
+            send_response = _traced(send_response, trace, hooks)
         try:
             request = request_data.decode('utf-8')
             if not request:
@@ -585,6 +1192,7 @@ class __HTTP(Thread):
             if not request_lines:
                 return
 
+            config = self.__config
             try:
                 method, path_with_query, version = request_lines[0].split(' ')
             except ValueError:
@@ -592,9 +1200,12 @@ class __HTTP(Thread):
                 return
 
             if '?' in path_with_query:
-                path, query_params = path_with_query.split('?', 1)
+                req_path, query_params = path_with_query.split('?', 1)
             else:
-                path, query_params = path_with_query, ""
+                req_path, query_params = path_with_query, ""
+            if trace is not None:
+                trace.method, trace.path = method, req_path
+                trace.mark("parse")
 
             if not version.startswith("HTTP/"):
                 send_response(f"HTTP/1.1 400 Bad Request\r\nContent-Type: text/plain\r\n\r\nInvalid HTTP version".encode('utf-8'))
@@ -606,15 +1217,24 @@ class __HTTP(Thread):
                 )
                 return
 
-            if not self.__methodes.get(method, False):
+            admin = self._admin
+            if admin is not None and req_path == admin[0] and method == "GET" \
+                    and client_ip in ("", "127.0.0.1", "::1"):
+                send_response(self.__admin_response(admin[1], version))
+                return
+
+            methodes = config.methodes
+            if not methodes.get(method, False):
                 send_response(
                     f"{version} 405 Method Not Allowed\r\n"
-                    f"Allow: {', '.join(k for k,v in self.__methodes.items() if v)}\r\n\r\n".encode('utf-8')
+                    f"Allow: {', '.join(k for k,v in methodes.items() if v)}\r\n\r\n".encode('utf-8')
                 )
                 return
 
-            file_path = path[1:] if path != "/" else self.main_file
+            file_path = req_path[1:] if req_path != "/" else config.main_file
             file_path = path.normpath(file_path)
+            if trace is not None:
+                trace.mark("normalise")
             
             if file_path.startswith('..') or '/../' in file_path:
                 data = b"<html><body><h1>403 Forbidden - Invalid Path</h1></body></html>"
@@ -629,9 +1249,9 @@ class __HTTP(Thread):
                 send_response(forbidden_response)
                 return
 
-            full_path = path.join(self.dir, file_path)
+            full_path = path.join(config.directory, file_path)
 
-            if file_path in self.blacklist:
+            if file_path in config.blacklist:
                 data = b"<html><body><h1>403 Forbidden - Access Denied</h1><p>This resource is blacklisted.</p></body></html>"
                 blacklist_response = (
                     f"{version} 403 Forbidden\r\n"
@@ -644,6 +1264,13 @@ class __HTTP(Thread):
                 send_response(blacklist_response)
                 return
 
+            info = _extension_info(full_path) if method in ("GET", "HEAD") else None
+            if trace is not None:
+                trace.mark("blacklist")
+                if info is not None and info.interpreter is not None and config.backend_enabled:
+                    trace.handler_stage = "backend"
+                _run_hooks(hooks, "on_route", trace)
+
             body = b""
             if method in ["POST", "PUT", "PATCH"]:
                 if "\r\n\r\n" in request:
@@ -654,17 +1281,15 @@ class __HTTP(Thread):
             if method == "OPTIONS":
                 response = self.options(version)
             elif method == "GET":
-                response = self.get(full_path, True, version, query_params)
+                response = self.get(full_path, True, version, query_params, client_ip, config, info)
             elif method == "HEAD":
-                response = self.get(full_path, False, version, query_params)
+                response = self.get(full_path, False, version, query_params, client_ip, config, info)
             elif method == "POST":
                 response = self.post(full_path, body, version)
             elif method == "PUT":
                 response = self.put(full_path, body, version)
             elif method == "DELETE":
-                response = self.delete(full_path, version)
-            elif method == "CONNECT":
-                response = self.connect(file_path, version)
+                response = self.delete(full_path, version, config)
             elif method == "TRACE":
                 response = self.trace(full_path, request, version)
             elif method == "PATCH":
@@ -699,45 +1324,738 @@ class __HTTP(Thread):
                 "Connection: close\r\n\r\n"
                 f"<html><body><h1>500 Internal Server Error</h1><p>An unexpected error occurred: {str(e)}</p></body></html>"
             ).encode('utf-8'))
+        finally:
+            if trace is not None and "send" not in trace.stages:
+                _run_hooks(hooks, "on_send_done", trace)
+
+
+class _Connection:
+    __slots__ = ['sock', 'ip', 'limiter', 'buffer', 'state', 'deadline', 'header_end', 'body_length']
+    IDLE, HEADER, BODY = 0, 1, 2
+
+    def __init__(self, sock: socket, ip: str, limiter: RateLimiter) -> None:
+        self.sock = sock
+        self.ip = ip
+        self.limiter = limiter
+        self.buffer = bytearray()
+        self.state = _Connection.HEADER
+        self.deadline = 0.0
+        self.header_end = -1
+        self.body_length = 0
+
+
+def _header_tokens(head: bytes, name: bytes) -> list:
+    """Return the lowercased comma-separated tokens of every `name` header in `head`, or None if absent."""
+    tokens = None
+    for line in head.split(b"\r\n")[1:]:
+        key, sep, value = line.partition(b":")
+        if sep and key.strip().lower() == name:
+            tokens = (tokens or []) + [token.strip().lower() for token in value.split(b",")]
+    return tokens
+
+
+def _wants_keep_alive(request_head: bytes) -> bool:
+    tokens = _header_tokens(request_head, b"connection") or []
+    if b"close" in tokens:
+        return False
+    if request_head.split(b"\r\n", 1)[0].rstrip().upper().endswith(b"HTTP/1.1"):
+        return True
+    return b"keep-alive" in tokens
+
+
+def _keep_alive(request_head: bytes, response_head: bytes) -> bool:
+    if b"close" in (_header_tokens(response_head, b"connection") or []):
+        return False
+    status = response_head.split(b"\r\n", 1)[0].split(b" ", 2)[1:2]
+    if _header_tokens(response_head, b"content-length") is None and status not in ([b"204"], [b"304"]):
+        return False
+    return _wants_keep_alive(request_head)
+
+
+_HOP_HEADERS = frozenset({b"connection", b"keep-alive", b"proxy-connection", b"te", b"upgrade"})
+
+
+class _Stream:
+    __slots__ = ['sock', 'buffer']
+
+    def __init__(self, sock: socket) -> None:
+        self.sock = sock
+        self.buffer = bytearray()
+
+    def __fill(self) -> None:
+        data = self.sock.recv(65536)
+        if not data:
+            raise ConnectionError("Upstream closed the connection")
+        self.buffer += data
+
+    def read_until(self, marker: bytes, limit: int = 65536) -> bytes:
+        while True:
+            end = self.buffer.find(marker)
+            if end >= 0:
+                end += len(marker)
+                data = bytes(self.buffer[:end])
+                del self.buffer[:end]
+                return data
+            if len(self.buffer) > limit:
+                raise ConnectionError("Upstream response header too large")
+            self.__fill()
+
+    def chunks(self, length: int):
+        """Yield `length` bytes as they arrive, or everything until EOF if `length` is -1."""
+        while length:
+            if not self.buffer:
+                try:
+                    self.__fill()
+                except ConnectionError:
+                    if length < 0:
+                        return
+                    raise
+            data = bytes(self.buffer if length < 0 else self.buffer[:length])
+            del self.buffer[:len(data)]
+            if length > 0:
+                length -= len(data)
+            yield data
+
+
+class _Upstream:
+    __slots__ = ['host', 'port', 'pool_size', 'timeout', 'healthy', 'active', '__idle', '__lock']
+
+    def __init__(self, target: str, pool_size: int = 8, timeout: float = 30.0) -> None:
+        host, sep, port = target.rpartition(':')
+        self.host, self.port = (host, int(port)) if sep else (target, 80)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.healthy = True
+        self.active = 0
+        self.__idle = []
+        self.__lock = Lock()
+
+    def __usable(self, sock: socket) -> bool:
+        sock.setblocking(False)
+        try:
+            sock.recv(1, MSG_PEEK)
+        except BlockingIOError:
+            sock.settimeout(self.timeout)
+            return True
+        except OSError:
+            pass
+        return False
+
+    def acquire(self) -> socket:
+        with self.__lock:
+            self.active += 1
+            while self.__idle:
+                sock = self.__idle.pop()
+                if self.__usable(sock):
+                    return sock
+                sock.close()
+        try:
+            return create_connection((self.host, self.port), self.timeout)
+        except OSError:
+            self.release(None, False)
+            raise
+
+    def release(self, sock: socket, reusable: bool) -> None:
+        with self.__lock:
+            self.active -= 1
+            if sock is not None and reusable and len(self.__idle) < self.pool_size:
+                self.__idle.append(sock)
+                return
+        if sock is not None:
+            sock.close()
+
+    def probe(self, health_path: str, timeout: float) -> bool:
+        try:
+            with create_connection((self.host, self.port), timeout) as sock:
+                if health_path is None:
+                    return True
+                sock.sendall(f"GET {health_path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                             "Connection: close\r\n\r\n".encode('utf-8'))
+                status = int(_Stream(sock).read_until(b"\r\n").split(b" ", 2)[1])
+                return status < 500
+        except (OSError, ValueError, IndexError):
+            return False
+
+    def close(self) -> None:
+        with self.__lock:
+            for sock in self.__idle:
+                sock.close()
+            self.__idle.clear()
+
+
+class _ProxyRoute:
+    __slots__ = ['prefix', 'upstreams', 'balance', 'health_path', 'health_interval', 'next_check',
+                 '__index', '__lock', '__checking']
+
+    def __init__(self, prefix: str, upstreams: list, balance: str, health_path: str,
+                 health_interval: float) -> None:
+        if balance not in ("round_robin", "least_connections"):
+            raise ValueError(f"Unknown balancing strategy: {balance}")
+        self.prefix = prefix.rstrip('/')
+        self.upstreams = tuple(upstreams)
+        self.balance = balance
+        self.health_path = health_path
+        self.health_interval = health_interval
+        self.next_check = 0.0
+        self.__index = 0
+        self.__lock = Lock()
+        self.__checking = Lock()
+
+    def matches(self, target: str) -> bool:
+        prefix = self.prefix
+        return target.startswith(prefix) and (len(target) == len(prefix) or target[len(prefix)] in '/?')
+
+    def choose(self) -> _Upstream:
+        healthy = [upstream for upstream in self.upstreams if upstream.healthy]
+        if not healthy:
+            return None
+        if self.balance == "least_connections":
+            return min(healthy, key=lambda upstream: upstream.active)
+        with self.__lock:
+            self.__index += 1
+            return healthy[self.__index % len(healthy)]
+
+    def check(self) -> None:
+        # A probe never outlives the interval, and a slow round is skipped rather than stacked.
+        if not self.__checking.acquire(blocking=False):
+            return
+        try:
+            for upstream in self.upstreams:
+                upstream.healthy = upstream.probe(self.health_path, min(upstream.timeout, self.health_interval))
+        finally:
+            self.__checking.release()
 
 
 class TCP(__HTTP):
     """
     TCP server implementation for HTTP protocol.
 
-    Handles incoming TCP connections by creating a new thread for each client.
+    A single reactor thread accepts connections and reads request headers and
+    bodies without blocking, enforcing per-connection deadlines. Complete
+    requests are handed to a worker thread, and keep-alive connections return
+    to the reactor once the response has been sent. Slow or stalled clients are
+    reaped by the reactor instead of pinning a thread each.
     Supports standard HTTP methods, file serving, and blacklist protection.
-    Implements keep-alive connections and connection pooling.
-    Includes HTTP version detection (1.0, 1.1, 2.0).
+
+    Limits (see set_timeouts() and set_header_limits()):
+        header_timeout: Seconds allowed to receive the complete request headers
+        body_timeout: Seconds allowed to receive the request body
+        keepalive_timeout: Seconds an idle keep-alive connection is kept open
+        send_timeout: Seconds a send may go without making progress
+        max_header_size: Maximum size in bytes of the request headers
+        max_header_count: Maximum number of request header lines
+
+    Reverse proxy (see add_proxy() and allow_tunnel()):
+        Requests whose path starts with a proxied prefix are forwarded to one of
+        the prefix upstreams, chosen round-robin or by least connections among
+        the healthy ones. Upstream connections are kept alive in a per-upstream
+        pool, and request and response bodies are streamed, never buffered whole.
+        CONNECT opens a bidirectional tunnel to an allowed host:port.
 
     Methods:
-        run(): Main server loop that accepts and handles client connections
-        __handle_client(client, addr): Processes individual client requests
-        __parse_http_version(version_string): Parses and validates HTTP version
+        run(): Reactor loop that accepts connections and reads requests
+        stop(drain_timeout): Stops accepting and waits for in-flight requests
+        reconfigure(**changes): Atomically swaps the serving configuration
+        add_proxy(prefix, upstreams): Forwards a path prefix to upstream servers
+        allow_tunnel(*targets): Allows CONNECT tunnels to the given host:port targets
+        __serve(conn, request): Processes one complete request in a worker thread
 
     Example of use:
         >>> server = TCP()
+        >>> server.set_timeouts(header=5, keepalive=2)
+        >>> server.add_proxy("/api", ["127.0.0.1:8001", "127.0.0.1:8002"])
         >>> server.start()  # Starts server on default port 80
     """
-    def __init__(self, directory: str = "./", main_file: str = "index.html") -> None:
-        super().__init__(socket(AF_INET, SOCK_STREAM), directory, main_file)
-        self.__socket.setsockopt(SOL_SOCKET, socket.SO_KEEPALIVE, 1)
-        self.__socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 60)
-        self.__socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10)
-        self.__socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 6)
-
-    def __handle_client(self, client: socket) -> None:
+    def __init__(self, directory: str = "./", main_file: str = "index.html", port: int = 80) -> None:
+        super().__init__(socket(AF_INET, SOCK_STREAM), directory, main_file, port)
+        self._socket.setsockopt(SOL_SOCKET, SO_KEEPALIVE, 1)
+        self._socket.setsockopt(IPPROTO_TCP, TCP_KEEPIDLE, 60)
+        self._socket.setsockopt(IPPROTO_TCP, TCP_KEEPINTVL, 10)
+        self._socket.setsockopt(IPPROTO_TCP, TCP_KEEPCNT, 6)
+        self.header_timeout = 10.0
+        self.body_timeout = 30.0
+        self.keepalive_timeout = 5.0
+        self.send_timeout = 10.0
+        self.max_header_size = 8192
+        self.max_header_count = 100
+        self.max_body_size = 10 * 1024 * 1024
+        self.tunnel_timeout = 300.0
+        self.__proxies = ()
+        self.__health = None
+        self.__tunnels = frozenset()
+        self.__resumed = deque()
+        self.__wakeup, self.__waker = socketpair()
+
+    def set_timeouts(self, header: float = None, body: float = None, keepalive: float = None,
+                     send: float = None, tunnel: float = None) -> None:
+        if header is not None:
+            self.header_timeout = header
+        if body is not None:
+            self.body_timeout = body
+        if keepalive is not None:
+            self.keepalive_timeout = keepalive
+        if send is not None:
+            self.send_timeout = send
+        if tunnel is not None:
+            self.tunnel_timeout = tunnel
+
+    def set_header_limits(self, max_size: int = None, max_count: int = None) -> None:
+        if max_size is not None:
+            self.max_header_size = max_size
+        if max_count is not None:
+            self.max_header_count = max_count
+
+    def add_proxy(self, prefix: str, upstreams: list, balance: str = "round_robin", health_path: str = "/",
+                  health_interval: float = 5.0, pool_size: int = 8, timeout: float = 30.0) -> None:
+        """
+        Forward requests under `prefix` to the given "host:port" upstreams.
+
+        `balance` is "round_robin" or "least_connections". Upstreams are probed
+        with a GET on `health_path` every `health_interval` seconds (a plain TCP
+        connect if None) and skipped while unhealthy. A probe waits at most
+        `health_interval` seconds, or `timeout` if shorter.
+        """
+        route = _ProxyRoute(prefix, [_Upstream(target, pool_size, timeout) for target in upstreams],
+                            balance, health_path, health_interval)
+        proxies = [proxy for proxy in self.__proxies if proxy.prefix != route.prefix] + [route]
+        self.__proxies = tuple(sorted(proxies, key=lambda proxy: len(proxy.prefix), reverse=True))
+        if self.is_alive():
+            self.__start_health()
+
+    def allow_tunnel(self, *targets: str) -> None:
+        self.__tunnels = self.__tunnels | set(targets)
+
+    def __route(self, target: str) -> _ProxyRoute:
+        for route in self.__proxies:
+            if route.matches(target):
+                return route
+        return None
+
+    def __start_health(self) -> None:
+        if self.__health is None:
+            self.__health = Thread(target=self.__check_health, daemon=True)
+            self.__health.start()
+
+    def __check_health(self) -> None:
+        while not self._draining.wait(1.0):
+            now = monotonic()
+            for route in self.__proxies:
+                if now >= route.next_check:
+                    route.next_check = now + route.health_interval
+                    Thread(target=route.check, daemon=True).start()
+
+    def __error(self, status: str) -> bytes:
+        return (f"HTTP/1.1 {status}\r\n"
+                "Content-Length: 0\r\n"
+                f"Date: {strftime('%a, %d %b %Y %H:%M:%S GMT', gmtime())}\r\n"
+                "Server: HTTP Sython 1.2 Secure\r\n"
+                "Connection: close\r\n\r\n").encode('utf-8')
+
+    def __close(self, conn: _Connection, status: str = None) -> None:
+        if status is not None:
+            try:
+                conn.sock.send(self.__error(status))
+            except OSError:
+                pass
+        conn.sock.close()
+        if conn.limiter is not None:
+            conn.limiter.release_connection(conn.ip)
+
+    def __send_all(self, sock: socket, data: bytes) -> None:
+        view = memoryview(data)
+        while view:
+            sent = sock.send(view)
+            view = view[sent:]
+
+    def __accept(self, selector: DefaultSelector) -> None:
+        while True:
+            try:
+                client, addr = self._socket.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            limiter = self.rate_limiter
+            if limiter is not None and not limiter.acquire_connection(addr[0]):
+                try:
+                    client.send(self.limit_exceeded("503 Service Unavailable"))
+                except OSError:
+                    pass
+                client.close()
+                continue
+            client.setblocking(False)
+            conn = _Connection(client, addr[0], limiter)
+            conn.deadline = monotonic() + self.header_timeout
+            selector.register(client, EVENT_READ, conn)
+
+    def __read(self, selector: DefaultSelector, conn: _Connection) -> None:
+        try:
+            data = conn.sock.recv(65536)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            selector.unregister(conn.sock)
+            self.__close(conn)
+            return
+        conn.buffer += data
+        self.__advance(selector, conn)
+
+    def __advance(self, selector: DefaultSelector, conn: _Connection) -> None:
+        buffer = conn.buffer
+        if conn.state == _Connection.IDLE:
+            conn.state = _Connection.HEADER
+            conn.deadline = monotonic() + self.header_timeout
+
+        if conn.state == _Connection.HEADER:
+            end = buffer.find(b"\r\n\r\n")
+            if end < 0:
+                if len(buffer) > self.max_header_size:
+                    selector.unregister(conn.sock)
+                    self.__close(conn, "431 Request Header Fields Too Large")
+                return
+            if end + 4 > self.max_header_size or buffer.count(b"\r\n", 0, end) > self.max_header_count:
+                selector.unregister(conn.sock)
+                self.__close(conn, "431 Request Header Fields Too Large")
+                return
+            if conn.limiter is not None and not conn.limiter.allow_request(conn.ip):
+                selector.unregister(conn.sock)
+                try:
+                    conn.sock.send(self.limit_exceeded())
+                except OSError:
+                    pass
+                self.__close(conn)
+                return
+
+            length = 0
+            for line in bytes(buffer[:end]).split(b"\r\n")[1:]:
+                name, _, value = line.partition(b":")
+                name = name.strip().lower()
+                if name == b"content-length":
+                    try:
+                        length = int(value.strip())
+                    except ValueError:
+                        length = -1
+                elif name == b"transfer-encoding" and value.strip().lower() != b"identity":
+                    selector.unregister(conn.sock)
+                    self.__close(conn, "411 Length Required")
+                    return
+            if length < 0:
+                selector.unregister(conn.sock)
+                self.__close(conn, "400 Bad Request")
+                return
+
+            method, _, target = bytes(buffer[:buffer.find(b"\r\n")]).decode('latin-1').partition(' ')
+            target = target.partition(' ')[0]
+            if method == "CONNECT" and not target.rpartition(':')[2].isdigit():
+                selector.unregister(conn.sock)
+                self.__close(conn, "400 Bad Request")
+                return
+            if self.config.methodes.get(method, False) and (method == "CONNECT" or self.__proxies):
+                admin = self._admin
+                route = None
+                if method != "CONNECT" and (admin is None or target.partition('?')[0] != admin[0]):
+                    route = self.__route(target)
+                if route is not None or method == "CONNECT":
+                    selector.unregister(conn.sock)
+                    head = bytes(buffer[:end + 4])
+                    body = bytes(buffer[end + 4:end + 4 + length])
+                    del buffer[:end + 4 + len(body)]
+                    self._begin_request()
+                    Thread(target=self.__forward, args=(conn, head, body, length - len(body), route),
+                           daemon=True).start()
+                    return
+
+            if length > self.max_body_size:
+                selector.unregister(conn.sock)
+                self.__close(conn, "413 Payload Too Large")
+                return
+            conn.header_end = end + 4
+            conn.body_length = length
+            conn.state = _Connection.BODY
+            conn.deadline = monotonic() + self.body_timeout
+
+        size = conn.header_end + conn.body_length
+        if len(buffer) < size:
+            return
+
+        selector.unregister(conn.sock)
+        request = bytes(buffer[:size])
+        head_end = conn.header_end
+        del buffer[:size]
+        conn.header_end = -1
+        conn.body_length = 0
+        self._begin_request()
+        Thread(target=self.__serve, args=(conn, request, head_end), daemon=True).start()
+
+    def __reap(self, selector: DefaultSelector, now: float) -> None:
+        for key in list(selector.get_map().values()):
+            conn = key.data
+            if conn is None or conn.deadline > now:
+                continue
+            selector.unregister(conn.sock)
+            self.__close(conn, None if conn.state == _Connection.IDLE else "408 Request Timeout")
+
+    def __resume(self, selector: DefaultSelector) -> None:
+        try:
+            while self.__wakeup.recv(4096):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+        while self.__resumed:
+            conn = self.__resumed.popleft()
+            if self._draining.is_set():
+                self.__close(conn)
+                continue
+            conn.state = _Connection.IDLE
+            conn.deadline = monotonic() + self.keepalive_timeout
+            selector.register(conn.sock, EVENT_READ, conn)
+            if conn.buffer:
+                self.__advance(selector, conn)
+
+    def __serve(self, conn: _Connection, request: bytes, head_end: int) -> None:
+        sock = conn.sock
+        keep = False
         try:
-            request = client.recv(8192)
-            self.handle_requests(request, client.send)
+            sock.settimeout(self.send_timeout)
+            kept = []
+            def send_response(response: bytes) -> None:
+                if not kept:
+                    split = response.find(b"\r\n\r\n") + 2
+                    kept.append(_keep_alive(request[:head_end], response[:split]))
+                    # HTTP/1.0 clients close unless the response announces the kept connection.
+                    if kept[0] and _header_tokens(response[:split], b"connection") is None \
+                            and not request.split(b"\r\n", 1)[0].rstrip().upper().endswith(b"HTTP/1.1"):
+                        response = response[:split] + b"Connection: keep-alive\r\n" + response[split:]
+                self.__send_all(sock, response)
+            self.handle_requests(request, send_response, conn.ip)
+            keep = bool(kept) and kept[0]
+        except Exception:
+            keep = False
         finally:
-            client.close()
-        
+            self.__finish(conn, keep)
+
+    def __forward(self, conn: _Connection, head: bytes, body: bytes, remaining: int, route: _ProxyRoute) -> None:
+        hooks = self._hooks
+        trace = None
+        if hooks:
+            trace = RequestTrace(conn.ip)
+            _run_hooks(hooks, "on_request_start", trace)
+            method, _, target = head[:head.find(b"\r\n")].decode('latin-1').partition(' ')
+            trace.method, trace.path = method, target.partition(' ')[0].partition('?')[0]
+            trace.handler_stage = "tunnel" if route is None else "proxy"
+            trace.mark("parse")
+            _run_hooks(hooks, "on_route", trace)
+        status = []
+        def respond(response: bytes) -> None:
+            if not status:
+                status.append(response[:response.find(b"\r\n")])
+            self.__send_all(conn.sock, response)
+
+        keep = False
+        try:
+            conn.sock.settimeout(self.send_timeout)
+            if route is None:
+                self.__tunnel(conn, head, respond)
+            else:
+                keep = self.__proxy(conn, head, body, remaining, route, respond)
+        except Exception:
+            keep = False
+        finally:
+            if trace is not None:
+                trace.mark(trace.handler_stage)
+                trace.status = status[0].decode('latin-1').partition(' ')[2] if status else ""
+                _run_hooks(hooks, "on_handler_done", trace)
+                _run_hooks(hooks, "on_send_done", trace)
+            self.__finish(conn, keep)
+
+    def __proxy(self, conn: _Connection, head: bytes, body: bytes, remaining: int, route: _ProxyRoute,
+                respond: callable) -> bool:
+        lines = head[:-4].split(b"\r\n")
+        method = lines[0].split(b" ", 1)[0]
+        forwarded = [lines[0]] + [line for line in lines[1:]
+                                  if line.partition(b":")[0].strip().lower() not in _HOP_HEADERS]
+        forwarded += [b"Connection: keep-alive", b"X-Forwarded-For: " + conn.ip.encode('latin-1'), b"", b""]
+
+        upstream = route.choose()
+        if upstream is None:
+            respond(self.__error("503 Service Unavailable"))
+            return False
+        try:
+            remote = upstream.acquire()
+        except OSError:
+            upstream.healthy = False
+            respond(self.__error("502 Bad Gateway"))
+            return False
+
+        answered = reusable = False
+        try:
+            self.__send_all(remote, b"\r\n".join(forwarded) + body)
+            conn.sock.settimeout(self.body_timeout)
+            while remaining > 0:
+                data = conn.sock.recv(min(remaining, 65536))
+                if not data:
+                    raise ConnectionError("Client closed the connection")
+                self.__send_all(remote, data)
+                remaining -= len(data)
+            conn.sock.settimeout(self.send_timeout)
+
+            stream = _Stream(remote)
+            response = stream.read_until(b"\r\n\r\n")
+            while response[9:10] == b"1" and response[9:12] != b"101":
+                response = stream.read_until(b"\r\n\r\n")
+            lines = response[:-4].split(b"\r\n")
+            status = int(lines[0].split(b" ", 2)[1])
+
+            length, chunked, kept = -1, False, [lines[0]]
+            closing = b"close" in (_header_tokens(response, b"connection") or [])
+            for line in lines[1:]:
+                name, _, value = line.partition(b":")
+                name, value = name.strip().lower(), value.strip().lower()
+                if name == b"content-length":
+                    length = int(value)
+                elif name == b"transfer-encoding":
+                    chunked = value.endswith(b"chunked")
+                if name not in _HOP_HEADERS:
+                    kept.append(line)
+            if method == b"HEAD" or status in (204, 304):
+                length, chunked = 0, False
+            framed = chunked or length >= 0
+            keep = framed and _wants_keep_alive(head)
+            kept += [b"Connection: keep-alive" if keep else b"Connection: close", b"", b""]
+
+            answered = True
+            respond(b"\r\n".join(kept))
+            if chunked:
+                while True:
+                    line = stream.read_until(b"\r\n")
+                    respond(line)
+                    size = int(line.split(b";", 1)[0], 16)
+                    if not size:
+                        break
+                    for data in stream.chunks(size + 2):
+                        respond(data)
+                while line != b"\r\n":
+                    line = stream.read_until(b"\r\n")
+                    respond(line)
+            else:
+                for data in stream.chunks(length):
+                    respond(data)
+            reusable = framed and not closing and not stream.buffer
+            return keep
+        except (OSError, ValueError, IndexError):
+            if not answered:
+                try:
+                    respond(self.__error("502 Bad Gateway"))
+                except OSError:
+                    pass
+            return False
+        finally:
+            upstream.release(remote, reusable)
+
+    def __tunnel(self, conn: _Connection, head: bytes, respond: callable) -> None:
+        parts = head.split(b"\r\n", 1)[0].split(b" ")
+        if len(parts) < 2:
+            respond(self.__error("400 Bad Request"))
+            return
+        target = parts[1].decode('latin-1')
+        if target not in self.__tunnels:
+            respond(self.__error("403 Forbidden"))
+            return
+        host, _, port = target.rpartition(':')
+        try:
+            remote = create_connection((host, int(port)), self.send_timeout)
+        except (OSError, ValueError):
+            respond(self.__error("502 Bad Gateway"))
+            return
+
+        with remote, DefaultSelector() as selector:
+            respond(b"HTTP/1.1 200 Connection established\r\n\r\n")
+            if conn.buffer:
+                self.__send_all(remote, bytes(conn.buffer))
+                conn.buffer.clear()
+            peers = {conn.sock: remote, remote: conn.sock}
+            selector.register(conn.sock, EVENT_READ)
+            selector.register(remote, EVENT_READ)
+            while selector.get_map():
+                events = selector.select(self.tunnel_timeout)
+                if not events:
+                    break
+                for key, _ in events:
+                    data = key.fileobj.recv(65536)
+                    if data:
+                        self.__send_all(peers[key.fileobj], data)
+                        continue
+                    selector.unregister(key.fileobj)
+                    try:
+                        peers[key.fileobj].shutdown(SHUT_WR)
+                    except OSError:
+                        pass
+
+    def __finish(self, conn: _Connection, keep: bool) -> None:
+        try:
+            if not keep or self._draining.is_set():
+                self.__close(conn)
+                return
+            conn.sock.setblocking(False)
+            self.__resumed.append(conn)
+            self._wakeup()
+        finally:
+            self._end_request()
+
+    def _wakeup(self) -> None:
+        try:
+            self.__waker.send(b"\0")
+        except OSError:
+            pass
+
     def run(self) -> None:
-        self.__socket.listen(10)
+        self._socket.listen(128)
+        self._socket.setblocking(False)
+        self.__wakeup.setblocking(False)
+        self.__waker.setblocking(False)
+        selector = DefaultSelector()
+        selector.register(self._socket, EVENT_READ)
+        selector.register(self.__wakeup, EVENT_READ)
+        if self.__proxies:
+            self.__start_health()
+        listening = True
+        next_reap = monotonic() + 0.5
         while True:
-            client, _ = self.__socket.accept()
-            Thread(target=self.__handle_client, args=(client)).start()
+            if self._draining.is_set():
+                if listening:
+                    listening = False
+                    selector.unregister(self._socket)
+                    self._socket.close()
+                    for key in list(selector.get_map().values()):
+                        if key.data is not None and not key.data.buffer:
+                            selector.unregister(key.fileobj)
+                            self.__close(key.data)
+                if monotonic() >= self._drain_deadline or (len(selector.get_map()) == 1 and not self._in_flight):
+                    break
+            for key, _ in selector.select(0.5):
+                if key.fileobj is self._socket:
+                    self.__accept(selector)
+                elif key.fileobj is self.__wakeup:
+                    self.__resume(selector)
+                else:
+                    self.__read(selector, key.data)
+            now = monotonic()
+            if now >= next_reap:
+                self.__reap(selector, now)
+                next_reap = now + 0.5
+
+        for key in list(selector.get_map().values()):
+            if key.data is not None:
+                self.__close(key.data)
+        selector.close()
+        self._wait_drained(self._drain_deadline - monotonic())
+        while self.__resumed:
+            self.__close(self.__resumed.popleft())
+        for route in self.__proxies:
+            for upstream in route.upstreams:
+                upstream.close()
 
 
 class UDP(__HTTP):
@@ -747,10 +2065,12 @@ class UDP(__HTTP):
     Handles incoming UDP datagrams by creating a new thread for each request.
     Implements datagram fragmentation for large responses and maintains
     stateless communication as per UDP specification.
+    CONNECT is disabled, since a datagram cannot carry a tunnel.
     Includes HTTP version detection (1.0, 1.1, 2.0).
 
     Methods:
         run(): Main server loop that receives and processes UDP datagrams
+        stop(drain_timeout): Stops receiving and waits for in-flight requests
         __handle_datagram(data, addr): Processes individual UDP requests
         __parse_http_version(version_string): Parses and validates HTTP version
 
@@ -758,21 +2078,33 @@ class UDP(__HTTP):
         >>> server = UDP()
         >>> server.start()
     """
-    def __init__(self, directory: str = "./", main_file: str = "index.html") -> None:
-        super().__init__(socket(AF_INET, SOCK_DGRAM), directory, main_file)
+    def __init__(self, directory: str = "./", main_file: str = "index.html", port: int = 80) -> None:
+        super().__init__(socket(AF_INET, SOCK_DGRAM), directory, main_file, port)
+        self.disable_methode("CONNECT")
 
     def __handle_datagram(self, data: bytes, addr: tuple) -> None:
         def send_chunked(response: bytes):
             for i in range(0, len(response), 8192):
                 chunk = response[i:i + 8192]
-                self.__socket.sendto(chunk, addr)
-        self.handle_requests(data, send_chunked)
+                self._socket.sendto(chunk, addr)
+        try:
+            self.handle_requests(data, send_chunked, addr[0])
+        finally:
+            self._end_request()
 
     def run(self) -> None:
-        while True:
+        self._socket.settimeout(0.5)
+        while not self._draining.is_set():
             try:
-                data, addr = self.__socket.recvfrom(65535)
-                Thread(target=self.__handle_datagram, args=(data, addr)).start()
+                data, addr = self._socket.recvfrom(65535)
+                limiter = self.rate_limiter
+                if limiter is not None and not limiter.allow_request(addr[0]):
+                    self._socket.sendto(self.limit_exceeded(), addr)
+                    continue
+                self._begin_request()
+                Thread(target=self.__handle_datagram, args=(data, addr), daemon=True).start()
             except Exception:
                 pass
+        self._wait_drained(self._drain_deadline - monotonic())
+        self._socket.close()
  
\ No newline at end of file
@@ -0,0 +1,72 @@
+import sys
+from os import path
+from socket import create_connection
+from time import monotonic, sleep
+from weakref import WeakKeyDictionary
+
+import pytest
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from main import TCP
+
+
+_pending = WeakKeyDictionary()
+
+
+def read_response(sock) -> tuple:
+    """Read one response from `sock` and return (head, body); (b"", b"") on EOF."""
+    data = _pending.pop(sock, b"")
+    while b"\r\n\r\n" not in data:
+        chunk = sock.recv(65536)
+        if not chunk:
+            return data, b""
+        data += chunk
+    head, _, body = data.partition(b"\r\n\r\n")
+    length = 0
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+    while len(body) < length:
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        body += chunk
+    if len(body) > length:
+        _pending[sock] = body[length:]
+    return head, body[:length]
+
+
+@pytest.fixture
+def server(tmp_path):
+    (tmp_path / "index.html").write_bytes(b"<h1>index</h1>")
+    server = TCP(str(tmp_path), port=0)
+    server.daemon = True
+    server.set_timeouts(header=0.5, body=0.5, keepalive=0.5, send=1)
+    yield server
+    server.stop(1)
+
+
+@pytest.fixture
+def connect(server):
+    sockets = []
+    port = server._socket.getsockname()[1]
+
+    def connect():
+        if not server.is_alive():
+            server.start()
+        deadline = monotonic() + 5
+        while True:
+            try:
+                sock = create_connection(("127.0.0.1", port), timeout=5)
+                break
+            except ConnectionRefusedError:
+                if monotonic() > deadline:
+                    raise
+                sleep(0.01)
+        sockets.append(sock)
+        return sock
+    yield connect
+    for sock in sockets:
+        sock.close()
@@ -0,0 +1,39 @@
+from types import MappingProxyType
+
+import pytest
+
+from main import TCP, ServerConfig
+
+
+def test_constructor_and_replace_copy_mutable_arguments():
+    blacklist, methodes = ["private.txt"], {"get": 1, "POST": False}
+    ages = {"image": 10, "script": 20, "default": "30"}
+    config = ServerConfig("./", "index.html", blacklist, 1, methodes, 0, ages)
+    blacklist.append("other.txt")
+    methodes["PUT"] = True
+    assert config.blacklist == frozenset({"private.txt"})
+    assert config.backend_enabled is True and config.cache_enabled is False
+    assert dict(config.methodes) == {"GET": True, "POST": False}
+    assert config.cache_max_age["default"] == 30
+    with pytest.raises(TypeError):
+        config.methodes["PUT"] = True
+
+    replaced = config._replace(blacklist=["a"], methodes={"delete": True})
+    assert replaced.blacklist == frozenset({"a"})
+    assert isinstance(replaced.methodes, MappingProxyType)
+    assert dict(replaced.methodes) == {"DELETE": True}
+
+
+def test_reconfigure_merges_into_a_new_snapshot():
+    server = TCP(port=0)
+    try:
+        before = server.config
+        server.reconfigure(blacklist=["secret"], methodes={"put": False}, cache_max_age={"default": 5})
+        after = server.config
+        assert before.blacklist == frozenset() and after.blacklist == frozenset({"secret"})
+        assert after.methodes["PUT"] is False and after.methodes["GET"] is True
+        assert dict(after.cache_max_age) == {"image": 31536000, "script": 86400, "default": 5}
+        with pytest.raises(TypeError):
+            server.config = after._asdict()
+    finally:
+        server._socket.close()
@@ -0,0 +1,118 @@
+import json
+from time import monotonic, sleep
+
+from main import RequestHook, RequestSampler, RequestTrace
+from conftest import read_response
+
+
+class Recorder(RequestHook):
+    def __init__(self) -> None:
+        self.calls = []
+
+    def on_request_start(self, trace) -> None:
+        self.calls.append("on_request_start")
+
+    def on_route(self, trace) -> None:
+        self.calls.append("on_route")
+
+    def on_handler_done(self, trace) -> None:
+        self.calls.append("on_handler_done")
+
+    def on_send_done(self, trace) -> None:
+        self.calls.append(("on_send_done", trace.method, trace.path, trace.status))
+
+
+class Raising(RequestHook):
+    def on_request_start(self, trace) -> None:
+        raise RuntimeError("start")
+
+    def on_route(self, trace) -> None:
+        raise RuntimeError("route")
+
+    def on_handler_done(self, trace) -> None:
+        raise RuntimeError("handler")
+
+    def on_send_done(self, trace) -> None:
+        raise RuntimeError("send")
+
+
+def settled(recorder: Recorder, count: int) -> list:
+    """on_send_done runs after the response is sent; wait for it."""
+    deadline = monotonic() + 5
+    while len(recorder.calls) < count and monotonic() < deadline:
+        sleep(0.01)
+    return recorder.calls
+
+
+def request(connect, raw: bytes) -> tuple:
+    sock = connect()
+    sock.sendall(raw)
+    return read_response(sock)
+
+
+def test_callbacks_run_in_order(server, connect):
+    recorder = Recorder()
+    server.add_hook(recorder)
+    assert request(connect, b"GET /?q=1 HTTP/1.1\r\n\r\n")[0].startswith(b"HTTP/1.1 200 OK")
+    assert settled(recorder, 4) == ["on_request_start", "on_route", "on_handler_done",
+                                    ("on_send_done", "GET", "/", "200 OK")]
+
+    recorder.calls.clear()
+    server.disable_methode("PUT")
+    assert request(connect, b"PUT /x HTTP/1.1\r\n\r\n")[0].startswith(b"HTTP/1.1 405")
+    assert settled(recorder, 3) == ["on_request_start", "on_handler_done",
+                                    ("on_send_done", "PUT", "/x", "405 Method Not Allowed")]
+
+
+def test_raising_hooks_do_not_block_the_response(server, connect):
+    recorder = Recorder()
+    server.add_hook(Raising())
+    server.add_hook(recorder)
+    head, body = request(connect, b"GET / HTTP/1.1\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 200 OK") and body == b"<h1>index</h1>"
+    assert settled(recorder, 4) == ["on_request_start", "on_route", "on_handler_done",
+                                    ("on_send_done", "GET", "/", "200 OK")]
+
+
+def trace(path: str, **stages) -> RequestTrace:
+    trace = RequestTrace("127.0.0.1")
+    trace.method, trace.path, trace.status = "GET", path, "200 OK"
+    trace.stages = stages
+    return trace
+
+
+def test_sampler_aggregates_stages():
+    sampler = RequestSampler(slow_threshold=60)
+    sampler.on_send_done(trace("/a", parse=0.001, handler=0.004))
+    sampler.on_send_done(trace("/b", parse=0.003))
+    dump = sampler.dump()
+    assert dump["requests"] == 2 and dump["slow"] == []
+    assert dump["stages"]["parse"] == {"count": 2, "total_ms": 4.0, "avg_ms": 2.0, "max_ms": 3.0}
+    assert dump["stages"]["handler"]["count"] == 1
+    sampler.clear()
+    assert sampler.dump() == {"requests": 0, "stages": {}, "slow": []}
+
+
+def test_sampler_ring_buffer_keeps_the_most_recent_slow_requests():
+    sampler = RequestSampler(slow_threshold=0, capacity=2)
+    for path in ("/1", "/2", "/3"):
+        sampler.on_send_done(trace(path, parse=0.001))
+    assert [entry["path"] for entry in sampler.dump()["slow"]] == ["/2", "/3"]
+    assert sampler.dump()["slow"][0]["stages_ms"] == {"parse": 1.0}
+
+
+def test_profile_endpoint_answers_loopback_clients_only(server, connect):
+    sampler = server.enable_profiling(slow_threshold=0)
+    recorder = Recorder()
+    server.add_hook(recorder)
+    request(connect, b"GET / HTTP/1.1\r\n\r\n")
+    settled(recorder, 4)
+    head, body = request(connect, b"GET /__sython/profile HTTP/1.1\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 200 OK") and b"application/json" in head
+    dump = json.loads(body)
+    assert dump["requests"] >= 1 and dump["slow"][0]["path"] == "/"
+
+    responses = []
+    server.handle_requests(b"GET /__sython/profile HTTP/1.1\r\n\r\n", responses.append, "10.0.0.1")
+    assert responses[0].startswith(b"HTTP/1.1 404") or responses[0].startswith(b"HTTP/1.1 403")
+    assert sampler.dump()["requests"] >= 2
@@ -0,0 +1,122 @@
+from os import getpid, kill
+from signal import getsignal, signal, SIGHUP, SIGTERM
+from socket import create_connection, socket, AF_INET, SOCK_DGRAM
+from threading import Event, Thread
+from time import monotonic, sleep
+
+import pytest
+
+from main import UDP, RequestHook
+from conftest import read_response
+
+
+@pytest.fixture
+def restore_signals():
+    handlers = {signum: getsignal(signum) for signum in (SIGHUP, SIGTERM)}
+    yield
+    for signum, handler in handlers.items():
+        signal(signum, handler)
+
+
+class Stall(RequestHook):
+    def __init__(self) -> None:
+        self.entered, self.release = Event(), Event()
+
+    def on_route(self, trace) -> None:
+        self.entered.set()
+        self.release.wait(5)
+
+
+def test_stop_refuses_new_connections_and_finishes_in_flight_requests(server, connect):
+    stall = Stall()
+    server.add_hook(stall)
+    sock = connect()
+    sock.sendall(b"GET / HTTP/1.1\r\nHost: test\r\n\r\n")
+    assert stall.entered.wait(5)
+
+    port = server._socket.getsockname()[1]
+    stopper = Thread(target=server.stop, args=(5,))
+    stopper.start()
+    deadline = monotonic() + 2
+    while True:
+        try:
+            create_connection(("127.0.0.1", port), timeout=1).close()
+        except ConnectionRefusedError:
+            break
+        assert monotonic() < deadline
+        sleep(0.05)
+    assert server.is_alive()
+
+    stall.release.set()
+    head, body = read_response(sock)
+    assert head.startswith(b"HTTP/1.1 200 OK") and body == b"<h1>index</h1>"
+    assert sock.recv(1) == b""
+    stopper.join(5)
+    assert not server.is_alive()
+
+
+def test_stop_abandons_requests_past_the_drain_timeout(server, connect):
+    stall = Stall()
+    server.add_hook(stall)
+    connect().sendall(b"GET / HTTP/1.1\r\n\r\n")
+    assert stall.entered.wait(5)
+    start = monotonic()
+    server.stop(0.3)
+    assert monotonic() - start < 2
+    assert not server.is_alive()
+    stall.release.set()
+
+
+def test_udp_stop_closes_the_socket(tmp_path):
+    (tmp_path / "index.html").write_bytes(b"<h1>index</h1>")
+    server = UDP(str(tmp_path), port=0)
+    server.daemon = True
+    server.start()
+    with socket(AF_INET, SOCK_DGRAM) as sock:
+        sock.settimeout(5)
+        sock.sendto(b"GET / HTTP/1.1\r\n\r\n", ("127.0.0.1", server._socket.getsockname()[1]))
+        assert sock.recv(65536).startswith(b"HTTP/1.1 200 OK")
+    server.stop(1)
+    assert not server.is_alive()
+    assert server._socket.fileno() == -1
+
+
+def test_reconfigure_applies_to_a_running_listener(server, connect, tmp_path):
+    (tmp_path / "other.html").write_bytes(b"<h1>other</h1>")
+    sock = connect()
+    sock.sendall(b"GET /index.html HTTP/1.1\r\n\r\n")
+    assert read_response(sock)[0].startswith(b"HTTP/1.1 200 OK")
+
+    server.reconfigure(blacklist=["index.html"], main_file="other.html")
+    sock = connect()
+    sock.sendall(b"GET /index.html HTTP/1.1\r\n\r\n")
+    assert read_response(sock)[0].startswith(b"HTTP/1.1 403 Forbidden")
+    sock = connect()
+    sock.sendall(b"GET / HTTP/1.1\r\n\r\n")
+    assert read_response(sock)[1] == b"<h1>other</h1>"
+
+    server.disable_methode("GET")
+    sock.sendall(b"GET / HTTP/1.1\r\n\r\n")
+    assert read_response(sock)[0].startswith(b"HTTP/1.1 405 Method Not Allowed")
+
+
+def test_failed_reload_keeps_the_current_configuration(server, restore_signals, capsys):
+    results = iter([RuntimeError("bad config file"), {"unknown": 1}, {"main_file": "new.html"}])
+
+    def reload() -> dict:
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+    server.install_signal_handlers(reload=reload)
+    before = server.config
+
+    for _ in range(2):
+        kill(getpid(), SIGHUP)
+        sleep(0.05)
+        assert server.config is before
+    assert capsys.readouterr().err.count("reload failed") == 2
+
+    kill(getpid(), SIGHUP)
+    sleep(0.05)
+    assert server.config.main_file == "new.html"
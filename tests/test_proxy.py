@@ -0,0 +1,245 @@
+import json
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from socket import socket
+from threading import Thread, Event
+from time import monotonic, sleep
+
+import pytest
+
+import main
+from conftest import read_response
+
+
+class Upstream(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def reply(self, body: bytes) -> None:
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        self.server.peers.append(self.client_address[1])
+        if self.path.endswith("/slow"):
+            self.server.release.wait(5)
+        if self.path.endswith("/chunked"):
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            self.wfile.write(b"5\r\nhello\r\n6\r\n world\r\n0\r\n\r\n")
+        elif self.path.endswith("/unframed"):
+            self.send_response(200)
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.wfile.write(b"until close")
+            self.close_connection = True
+        else:
+            self.reply(f"{self.server.name} {self.path} {self.headers['X-Forwarded-For']}".encode())
+
+    def do_POST(self) -> None:
+        remaining, received = int(self.headers["Content-Length"]), 0
+        while remaining:
+            data = self.rfile.read(min(remaining, 65536))
+            received += len(data)
+            remaining -= len(data)
+        self.reply(str(received).encode())
+
+
+@pytest.fixture
+def upstream():
+    servers = []
+
+    def start(name: str) -> str:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Upstream)
+        server.daemon_threads = True
+        server.name, server.peers, server.release = name, [], Event()
+        Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+    yield start
+    for server in servers:
+        server.release.set()
+        server.shutdown()
+        server.server_close()
+
+
+def target(server) -> str:
+    return f"127.0.0.1:{server.server_address[1]}"
+
+
+def body(connect, path: str) -> bytes:
+    sock = connect()
+    sock.sendall(f"GET {path} HTTP/1.1\r\nHost: test\r\n\r\n".encode())
+    return read_response(sock)[1]
+
+
+def test_round_robin_alternates_upstreams(server, connect, upstream):
+    first, second = upstream("a"), upstream("b")
+    server.add_proxy("/api", [target(first), target(second)], health_path=None)
+    names = [body(connect, "/api/x?q=1").split(b" ")[0] for _ in range(4)]
+    assert sorted(names) == [b"a", b"a", b"b", b"b"]
+    assert names[0] != names[1] and names[1] != names[2]
+    assert body(connect, "/api/x?q=1").split(b" ", 1)[1] == b"/api/x?q=1 127.0.0.1"
+
+
+def test_paths_outside_the_prefix_are_served_locally(server, connect, upstream):
+    server.add_proxy("/api", [target(upstream("a"))], health_path=None)
+    assert body(connect, "/").startswith(b"<h1>index")
+    assert not body(connect, "/apix").startswith(b"a ")
+
+
+def test_least_connections_avoids_busy_upstream(server, connect, upstream):
+    busy, idle = upstream("busy"), upstream("idle")
+    server.add_proxy("/api", [target(busy), target(idle)], balance="least_connections", health_path=None)
+    slow = connect()
+    slow.sendall(b"GET /api/slow HTTP/1.1\r\nHost: test\r\n\r\n")
+    while not busy.peers:
+        sleep(0.01)
+    for _ in range(3):
+        assert body(connect, "/api/x").startswith(b"idle")
+        sleep(0.05)  # the upstream is released just after the response is streamed
+    busy.release.set()
+    assert read_response(slow)[1].startswith(b"busy")
+
+
+def test_upstream_connections_are_pooled(server, connect, upstream):
+    only = upstream("a")
+    server.add_proxy("/api", [target(only)], health_path=None)
+    for _ in range(3):
+        assert body(connect, "/api/x").startswith(b"a ")
+    assert len(set(only.peers)) == 1
+
+
+def test_unhealthy_upstream_is_skipped(server, connect, upstream):
+    with socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        dead = f"127.0.0.1:{probe.getsockname()[1]}"
+    live = upstream("live")
+    server.add_proxy("/api", [dead, target(live)], health_interval=0.2)
+    connect().close()
+    sleep(1.5)
+    assert [body(connect, "/api/x").split(b" ")[0] for _ in range(4)] == [b"live"] * 4
+
+
+def test_chunked_response_is_streamed_and_connection_kept(server, connect, upstream):
+    server.add_proxy("/api", [target(upstream("a"))], health_path=None)
+    sock = connect()
+    sock.sendall(b"GET /api/chunked HTTP/1.1\r\nHost: test\r\n\r\n")
+    data = b""
+    while not data.endswith(b"0\r\n\r\n"):
+        data += sock.recv(65536)
+    head, _, raw = data.partition(b"\r\n\r\n")
+    assert b"Transfer-Encoding: chunked" in head and b"Connection: keep-alive" in head
+    assert raw == b"5\r\nhello\r\n6\r\n world\r\n0\r\n\r\n"
+    sock.sendall(b"GET /api/x HTTP/1.1\r\nHost: test\r\n\r\n")
+    assert read_response(sock)[1].startswith(b"a ")
+
+
+def test_close_delimited_response_closes_client(server, connect, upstream):
+    server.add_proxy("/api", [target(upstream("a"))], health_path=None)
+    sock = connect()
+    sock.sendall(b"GET /api/unframed HTTP/1.1\r\nHost: test\r\n\r\n")
+    data = b""
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        data += chunk
+    head, _, raw = data.partition(b"\r\n\r\n")
+    assert b"Connection: close" in head
+    assert raw == b"until close"
+
+
+def test_large_request_body_is_streamed(server, connect, upstream):
+    server.max_body_size = 1024
+    server.add_proxy("/api", [target(upstream("a"))], health_path=None)
+    size = 8 * 1024 * 1024
+    sock = connect()
+    sock.sendall(f"POST /api/upload HTTP/1.1\r\nHost: test\r\nContent-Length: {size}\r\n\r\n".encode())
+    chunk = b"x" * 65536
+    for _ in range(size // len(chunk)):
+        sock.sendall(chunk)
+    assert read_response(sock)[1] == str(size).encode()
+
+
+def test_connect_tunnels_only_to_allowed_targets(server, connect):
+    echo = socket()
+    echo.bind(("127.0.0.1", 0))
+    echo.listen()
+
+    def serve() -> None:
+        client, _ = echo.accept()
+        with client:
+            while True:
+                data = client.recv(1024)
+                if not data:
+                    return
+                client.sendall(data.upper())
+    Thread(target=serve, daemon=True).start()
+    allowed = f"127.0.0.1:{echo.getsockname()[1]}"
+    server.allow_tunnel(allowed)
+
+    sock = connect()
+    sock.sendall(f"CONNECT {allowed} HTTP/1.1\r\n\r\n".encode())
+    assert read_response(sock)[0] == b"HTTP/1.1 200 Connection established"
+    sock.sendall(b"through the tunnel")
+    assert sock.recv(1024) == b"THROUGH THE TUNNEL"
+
+    for request in (b"CONNECT 127.0.0.1:1 HTTP/1.1\r\n\r\n", b"CONNECT\r\n\r\n"):
+        sock = connect()
+        sock.sendall(request)
+        assert read_response(sock)[0].split(b"\r\n")[0] in (b"HTTP/1.1 403 Forbidden", b"HTTP/1.1 400 Bad Request")
+    echo.close()
+
+
+def test_hanging_upstream_probe_is_bounded_by_the_health_interval(server, connect, upstream):
+    hanging = socket()
+    hanging.bind(("127.0.0.1", 0))
+    hanging.listen()
+    live = upstream("live")
+    server.add_proxy("/slow", [f"127.0.0.1:{hanging.getsockname()[1]}"], health_interval=0.3, timeout=30)
+    server.add_proxy("/api", [target(live)], health_interval=0.3)
+    connect().close()
+    sleep(2)
+    assert body(connect, "/api/x").startswith(b"live")
+    sock = connect()
+    sock.sendall(b"GET /slow/x HTTP/1.1\r\n\r\n")
+    assert read_response(sock)[0].startswith(b"HTTP/1.1 503 Service Unavailable")
+    hanging.close()
+
+
+def test_health_thread_only_runs_with_proxies(server, connect, upstream, monkeypatch):
+    checks = []
+
+    class RecordingThread(Thread):
+        def start(self) -> None:
+            checks.append(getattr(self._target, "__name__", ""))
+            super().start()
+    monkeypatch.setattr(main, "Thread", RecordingThread)
+    connect().close()
+    assert "__check_health" not in checks
+    server.add_proxy("/api", [target(upstream("a"))], health_path=None)
+    assert checks.count("__check_health") == 1
+
+
+def test_proxied_requests_are_traced_and_admin_path_stays_local(server, connect, upstream):
+    sampler = server.enable_profiling(slow_threshold=0)
+    server.add_proxy("/", [target(upstream("a"))], health_path=None)
+    assert body(connect, "/x?q=1").startswith(b"a /x?q=1")
+    sock = connect()
+    sock.sendall(b"CONNECT 127.0.0.1:1 HTTP/1.1\r\n\r\n")
+    assert read_response(sock)[0].startswith(b"HTTP/1.1 403")
+
+    deadline = monotonic() + 5
+    while len(sampler.dump()["slow"]) < 2 and monotonic() < deadline:
+        sleep(0.01)
+    dump = json.loads(body(connect, "/__sython/profile"))
+    proxied, tunnelled = dump["slow"][:2]
+    assert (proxied["method"], proxied["path"], proxied["status"]) == ("GET", "/x", "200 OK")
+    assert "proxy" in proxied["stages_ms"]
+    assert (tunnelled["method"], tunnelled["path"], tunnelled["status"]) == ("CONNECT", "127.0.0.1:1", "403 Forbidden")
+    assert "tunnel" in tunnelled["stages_ms"]
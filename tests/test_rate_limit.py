@@ -0,0 +1,120 @@
+from pathlib import Path
+from socket import socket, AF_INET, SOCK_DGRAM
+from threading import Thread
+from time import sleep
+
+import main
+from main import UDP, RateLimiter
+from conftest import read_response
+
+
+def test_flood_is_answered_by_the_reactor_without_worker_threads(server, connect, monkeypatch):
+    server.enable_rate_limit(rate=0.001, burst=2)
+    sock = connect()
+    started = []
+
+    class CountingThread(Thread):
+        def start(self) -> None:
+            started.append(self)
+            super().start()
+    monkeypatch.setattr(main, "Thread", CountingThread)
+
+    sock.sendall(b"GET / HTTP/1.1\r\nHost: test\r\n\r\n" * 5)
+    assert read_response(sock)[0].startswith(b"HTTP/1.1 200 OK")
+    assert read_response(sock)[0].startswith(b"HTTP/1.1 200 OK")
+    head = read_response(sock)[0]
+    assert head.startswith(b"HTTP/1.1 429 Too Many Requests") and b"Retry-After: 1" in head
+    assert sock.recv(1) == b""
+    assert len(started) == 2
+
+
+def test_tokens_refill_at_the_configured_rate():
+    limiter = RateLimiter(rate=20, burst=2)
+    assert limiter.allow_request("a") and limiter.allow_request("a")
+    assert not limiter.allow_request("a")
+    assert limiter.allow_request("b")
+    sleep(0.06)
+    assert limiter.allow_request("a")
+    assert not limiter.allow_request("a")
+
+
+def test_sweep_drops_only_idle_full_buckets():
+    limiter = RateLimiter(rate=1000, burst=1)
+    for ip in ("a", "b", "c"):
+        limiter.allow_request(ip)
+    assert limiter.acquire_connection("c")
+    sleep(0.01)
+    limiter.sweep()
+    assert len(limiter) == 1
+    limiter.release_connection("c")
+    limiter.sweep()
+    assert len(limiter) == 0
+
+
+def test_periodic_sweep_is_incremental():
+    limiter = RateLimiter(rate=1000, burst=1, sweep_interval=0)
+    limiter.sweep_batch = 16
+    for ip in range(100):
+        limiter.allow_request(str(ip))
+    sleep(0.01)
+    limiter.allow_request("new")
+    assert 80 <= len(limiter) < 101
+    for _ in range(10):
+        limiter.allow_request("new")
+    assert len(limiter) <= 2
+
+
+def test_full_table_fails_closed_until_a_bucket_can_be_evicted():
+    limiter = RateLimiter(rate=0.001, burst=1, max_clients=2)
+    assert limiter.allow_request("a") and limiter.allow_request("b")
+    assert not limiter.allow_request("c")
+    assert not limiter.acquire_connection("c") and not limiter.acquire_backend("c")
+    assert len(limiter) == 2
+
+    limiter = RateLimiter(rate=100, burst=1, max_clients=2)
+    assert limiter.allow_request("a") and limiter.allow_request("b")
+    sleep(0.05)
+    assert limiter.allow_request("c")
+    assert len(limiter) <= 2
+
+
+def test_connection_quota_answers_503(server, connect):
+    server.enable_rate_limit(max_connections=1)
+    first = connect()
+    first.sendall(b"GET / HTTP/1.1\r\n\r\n")
+    assert read_response(first)[0].startswith(b"HTTP/1.1 200 OK")
+    second = connect()
+    assert read_response(second)[0].startswith(b"HTTP/1.1 503 Service Unavailable")
+    first.close()
+    sleep(0.1)
+    third = connect()
+    third.sendall(b"GET / HTTP/1.1\r\n\r\n")
+    assert read_response(third)[0].startswith(b"HTTP/1.1 200 OK")
+
+
+def test_backend_quota_answers_503_before_running_the_script(server, connect):
+    (Path(server.dir) / "app.js").write_bytes(b"console.log('ran')")
+    server.enable_backend()
+    server.enable_rate_limit(max_backend=1)
+    assert server.rate_limiter.acquire_backend("127.0.0.1")
+    sock = connect()
+    sock.sendall(b"GET /app.js HTTP/1.1\r\n\r\n")
+    assert read_response(sock)[0].startswith(b"HTTP/1.1 503 Service Unavailable")
+
+
+def test_udp_answers_429_over_budget(tmp_path):
+    (tmp_path / "index.html").write_bytes(b"<h1>index</h1>")
+    server = UDP(str(tmp_path), port=0)
+    server.daemon = True
+    server.enable_rate_limit(rate=0.001, burst=1)
+    server.start()
+    try:
+        with socket(AF_INET, SOCK_DGRAM) as sock:
+            sock.settimeout(5)
+            address = ("127.0.0.1", server._socket.getsockname()[1])
+            sock.sendto(b"GET / HTTP/1.1\r\n\r\n", address)
+            assert sock.recv(65536).startswith(b"HTTP/1.1 200 OK")
+            sock.sendto(b"GET / HTTP/1.1\r\n\r\n", address)
+            assert sock.recv(65536).startswith(b"HTTP/1.1 429 Too Many Requests")
+    finally:
+        server.stop(1)
@@ -0,0 +1,110 @@
+from pathlib import Path
+from time import monotonic
+
+from main import _keep_alive, _wants_keep_alive
+from conftest import read_response
+
+
+def test_keep_alive_serves_several_requests_on_one_connection(connect):
+    sock = connect()
+    for _ in range(3):
+        sock.sendall(b"GET / HTTP/1.1\r\nHost: test\r\n\r\n")
+        head, body = read_response(sock)
+        assert head.startswith(b"HTTP/1.1 200 OK")
+        assert body == b"<h1>index</h1>"
+
+
+def test_pipelined_requests_are_answered_in_order(connect):
+    sock = connect()
+    sock.sendall(b"OPTIONS / HTTP/1.1\r\n\r\nTRACE /x HTTP/1.1\r\n\r\nGET / HTTP/1.1\r\n\r\n")
+    assert read_response(sock)[0].startswith(b"HTTP/1.1 204 No Content")
+    assert read_response(sock)[1] == b"TRACE /x HTTP/1.1\r\n\r\n"
+    assert read_response(sock)[1] == b"<h1>index</h1>"
+
+
+def test_connection_close_variants_close_the_connection(connect):
+    for header in (b"Connection:close", b"Connection: keep-alive, close", b"connection: CLOSE"):
+        sock = connect()
+        sock.sendall(b"GET / HTTP/1.1\r\n" + header + b"\r\n\r\n")
+        assert read_response(sock)[0].startswith(b"HTTP/1.1 200 OK")
+        assert sock.recv(1) == b""
+
+
+def test_http10_keep_alive_is_opt_in(connect):
+    sock = connect()
+    sock.sendall(b"GET / HTTP/1.0\r\nConnection: Keep-Alive\r\n\r\n")
+    head, body = read_response(sock)
+    assert head.startswith(b"HTTP/1.0 200 OK") and b"\r\nConnection: keep-alive" in head
+    assert body == b"<h1>index</h1>"
+    sock.sendall(b"GET / HTTP/1.0\r\n\r\n")
+    head = read_response(sock)[0]
+    assert head.startswith(b"HTTP/1.0 200 OK") and b"Connection:" not in head
+    assert sock.recv(1) == b""
+
+
+def test_idle_keep_alive_connection_is_closed(connect):
+    sock = connect()
+    sock.sendall(b"GET / HTTP/1.1\r\n\r\n")
+    read_response(sock)
+    start = monotonic()
+    assert sock.recv(1) == b""
+    assert monotonic() - start < 2
+
+
+def test_incomplete_headers_time_out_with_408(connect):
+    sock = connect()
+    sock.sendall(b"GET / HTTP/1.1\r\nHost: slow")
+    assert read_response(sock)[0].startswith(b"HTTP/1.1 408 Request Timeout")
+
+
+def test_incomplete_body_times_out_with_408(connect):
+    sock = connect()
+    sock.sendall(b"PUT /file.txt HTTP/1.1\r\nContent-Length: 10\r\n\r\nabc")
+    assert read_response(sock)[0].startswith(b"HTTP/1.1 408 Request Timeout")
+
+
+def test_oversized_headers_get_431(server, connect):
+    server.set_header_limits(max_size=256, max_count=5)
+    sock = connect()
+    sock.sendall(b"GET / HTTP/1.1\r\nX-Large: " + b"a" * 300 + b"\r\n\r\n")
+    assert read_response(sock)[0].startswith(b"HTTP/1.1 431")
+    sock = connect()
+    sock.sendall(b"GET / HTTP/1.1\r\n" + b"X-Header: value\r\n" * 6 + b"\r\n")
+    assert read_response(sock)[0].startswith(b"HTTP/1.1 431")
+
+
+def test_chunked_request_body_gets_411(connect):
+    sock = connect()
+    sock.sendall(b"POST /file.txt HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n")
+    assert read_response(sock)[0].startswith(b"HTTP/1.1 411 Length Required")
+
+
+def test_oversized_body_gets_413(server, connect):
+    server.max_body_size = 16
+    sock = connect()
+    sock.sendall(b"POST /file.txt HTTP/1.1\r\nContent-Length: 17\r\n\r\n")
+    assert read_response(sock)[0].startswith(b"HTTP/1.1 413 Payload Too Large")
+
+
+def test_keep_alive_header_parsing():
+    assert _wants_keep_alive(b"GET / HTTP/1.1\r\nHost: a")
+    assert not _wants_keep_alive(b"GET / HTTP/1.1\r\nConnection:close")
+    assert not _wants_keep_alive(b"GET / HTTP/1.1\r\nConnection: keep-alive, close")
+    assert not _wants_keep_alive(b"GET / HTTP/1.0")
+    assert _wants_keep_alive(b"GET / HTTP/1.0\r\nconnection: Keep-Alive")
+    assert _keep_alive(b"GET / HTTP/1.1", b"HTTP/1.1 200 OK\r\nContent-Length:3")
+    assert _keep_alive(b"GET / HTTP/1.1", b"HTTP/1.1 204 No Content")
+    assert not _keep_alive(b"GET / HTTP/1.1", b"HTTP/1.1 200 OK")
+    assert not _keep_alive(b"GET / HTTP/1.1", b"HTTP/1.1 200 OK\r\nContent-Length: 3\r\nConnection:Close")
+
+
+def test_script_files_are_static_while_the_backend_is_disabled(server, connect):
+    (Path(server.dir) / "app.js").write_bytes(b"console.log('static')")
+    server.enable_rate_limit(max_backend=1)
+    assert server.rate_limiter.acquire_backend("127.0.0.1")
+    sock = connect()
+    sock.sendall(b"GET /app.js HTTP/1.1\r\n\r\n")
+    head, body = read_response(sock)
+    assert head.startswith(b"HTTP/1.1 200 OK")
+    assert b"Content-Type: text/javascript" in head and b"Cache-Control: public, max-age=86400" in head
+    assert body == b"console.log('static')"